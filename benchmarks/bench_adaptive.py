@@ -0,0 +1,127 @@
+"""
+Adaptive bitrate switching against a throttled link: three local fake
+Icecast variants (64/128/320 kbps) whose connections are capped to
+--link kbps for the middle third of the run, then released.
+
+    python benchmarks/bench_adaptive.py [--seconds N] [--link KBPS]
+
+Prints every switch as it happens, then how long each phase took to
+settle on its variant and whether it flapped. Audio is only demuxed (no
+player), so this runs without ffplay or libVLC.
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from adaptive import AdaptiveController  # noqa: E402
+from backends import Playback  # noqa: E402
+from fake_icecast import FakeIcecast  # noqa: E402
+from icy import IcyDemuxer  # noqa: E402
+from prober import probe_stream  # noqa: E402
+from supervisor import watch  # noqa: E402
+
+
+class DemuxPlayback(Playback):
+    """A backend stand-in that reads and discards the stream like the demux pipeline does."""
+
+    backend = "demux"
+
+    def __init__(self, url):
+        super().__init__(url, lambda fields: None)
+        self.source = IcyDemuxer(url, None)
+        self.source.start()
+
+    def poll(self):
+        return None if self.source.is_alive() else 0
+
+    def wait(self):
+        while self.source.is_alive():
+            time.sleep(0.1)
+        return 0
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def bytes_received(self):
+        return self.source.bytes_received
+
+    def last_progress(self):
+        return self.source.last_data_at or self._created
+
+    def stop(self):
+        self.source.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--link", type=float, default=100, help="kbps while throttled")
+    args = parser.parse_args()
+
+    stations = [FakeIcecast(bitrate=kbps, name=f"Fake {kbps}").start() for kbps in (64, 128, 320)]
+    streams = [{"url": s.url, "bitrate": f"{s.bitrate} kbps", "codec": "mp3"} for s in stations]
+    started = time.monotonic()
+    switches = []
+
+    def on_event(event):
+        switches.append((time.monotonic() - started, event["from"], event["to"]))
+        print(f"{switches[-1][0]:6.1f}s  {event['from']:3d} → {event['to']:3d} kbps  ({event['reason']})")
+
+    controller = AdaptiveController(streams, streams[-1], down_seconds=3, up_after=4, up_max_wait=16,
+                                    probe=lambda stream: probe_stream(stream, window=1.5), on_event=on_event)
+
+    third = args.seconds / 3
+
+    def link():
+        time.sleep(third)
+        print(f"{time.monotonic() - started:6.1f}s  link throttled to {args.link:g} kbps")
+        for station in stations:
+            station.throttle_kbps = args.link
+        time.sleep(third)
+        print(f"{time.monotonic() - started:6.1f}s  link released")
+        for station in stations:
+            station.throttle_kbps = None
+
+    threading.Thread(target=link, daemon=True).start()
+    current, switch = streams[-1], None
+
+    def check():
+        nonlocal switch
+        switch = controller.check(playback)
+        return switch is not None or time.monotonic() - started >= args.seconds
+
+    try:
+        while time.monotonic() - started < args.seconds:
+            playback = DemuxPlayback(current["url"])
+            controller.start(current)
+            watch(playback, 0, check=check)
+            playback.stop()
+            if switch is not None:
+                current, switch = switch, None
+    finally:
+        for station in stations:
+            station.stop()
+
+    # Where each phase should end up, and whether it got there without reversing direction on the way
+    fits = [kbps for kbps in (64, 128, 320) if kbps <= args.link * 0.9]
+    for name, start, end, want in (("throttled", third, 2 * third, max(fits or [64])),
+                                   ("released", 2 * third, args.seconds, 320)):
+        phase = [(t, old, new) for t, old, new in switches if start <= t < end]
+        directions = [new > old for _, old, new in phase]
+        flaps = sum(a != b for a, b in zip(directions, directions[1:]))
+        if phase and phase[-1][2] == want:
+            result = f"settled on {want} kbps after {phase[-1][0] - start:.1f}s"
+        else:
+            result = f"did not settle on {want} kbps"
+        print(f"{name:9} {len(phase)} switches, {flaps} reversals, {result}")
+
+
+if __name__ == "__main__":
+    main()
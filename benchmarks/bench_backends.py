@@ -0,0 +1,93 @@
+"""
+Time to first audio and station-switch latency of each audio backend,
+playing two local fake Icecast stations back and forth.
+
+    python benchmarks/bench_backends.py [--backend ffplay|vlc ...] [--switches N]
+
+A switch is play() on the backend while another stream is still playing:
+stopping the old stream plus first audio of the new one. Backends that cannot
+start here (no ffplay on PATH, no libvlc) are reported and skipped.
+"""
+import argparse
+import select
+import shutil
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from backends import BACKENDS  # noqa: E402
+from fake_icecast import FakeIcecast  # noqa: E402
+
+
+def _play(backend, url, timeout):
+    """Start `url` and return its Playback once audio is flowing, pumping backend output like the player does."""
+    audio = threading.Event()
+    playback = backend.play(url, lambda fields: None, on_event=audio.set)
+    deadline = time.monotonic() + timeout
+    fd = playback.fileno()
+    while playback.first_audio_at is None and time.monotonic() < deadline:
+        remaining = deadline - time.monotonic()
+        if fd is None:
+            audio.wait(remaining)
+        elif select.select([fd], [], [], remaining)[0] and not playback.on_readable():
+            break
+    if playback.first_audio_at is None:
+        raise RuntimeError(f"no audio from {url} within {timeout}s")
+    return playback
+
+
+def bench(name, urls, switches, timeout):
+    if name == "ffplay" and not shutil.which("ffplay"):
+        print(f"{name:8} skipped: ffplay not on PATH")
+        return
+    try:
+        backend = BACKENDS[name]()
+    except (ImportError, RuntimeError) as e:
+        print(f"{name:8} skipped: {e}")
+        return
+
+    first, switch, stop = [], [], []
+    try:
+        playback = _play(backend, urls[0], timeout)
+        first.append(playback.stats()["first_audio"])
+        for i in range(switches):
+            previous = playback
+            playback = _play(backend, urls[(i + 1) % 2], timeout)
+            stats = playback.stats()
+            first.append(stats["first_audio"])
+            switch.append(stats["switch"])
+            stop.append(previous.stats()["stop"])
+    except RuntimeError as e:
+        print(f"{name:8} failed: {e}")
+        return
+    finally:
+        backend.close()
+
+    def ms(samples):
+        return f"{statistics.median(samples) * 1000:7.0f} ms" if samples else "      —"
+
+    print(f"{name:8} first audio {ms(first)}   switch {ms(switch)}   stop {ms(stop)}   (median, {switches} switches)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", action="append", choices=sorted(BACKENDS), help="default: all")
+    parser.add_argument("--switches", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=10)
+    args = parser.parse_args()
+
+    stations = [FakeIcecast(name="Fake A").start(), FakeIcecast(name="Fake B").start()]
+    try:
+        for name in args.backend or sorted(BACKENDS):
+            bench(name, [s.url for s in stations], args.switches, args.timeout)
+    finally:
+        for station in stations:
+            station.stop()
+
+
+if __name__ == "__main__":
+    main()
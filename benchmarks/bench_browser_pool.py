@@ -0,0 +1,67 @@
+"""
+Cold vs warm search latency: one HTMLSession per query (old behaviour)
+against the shared BrowserPool.
+
+    python benchmarks/bench_browser_pool.py jazz rock news --repeat 3
+
+Needs network access to fmstream.org and a Chromium that pyppeteer can start.
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from search import BASE_URL  # noqa: E402
+from browser import BrowserPool  # noqa: E402
+
+
+def render_with_session(url):
+    from requests_html import HTMLSession
+
+    session = HTMLSession()
+    try:
+        resp = session.get(url)
+        resp.html.render(timeout=20)
+        return resp.html.html
+    finally:
+        session.close()
+
+
+def timed(fn, url):
+    start = time.perf_counter()
+    fn(url)
+    return time.perf_counter() - start
+
+
+def report(label, samples):
+    cold, warm = samples[0], samples[1:]
+    line = f"{label:<16} cold {cold:7.2f}s"
+    if warm:
+        line += f"   warm median {statistics.median(warm):7.2f}s   min {min(warm):7.2f}s"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("queries", nargs="*", default=["jazz", "rock", "news"])
+    parser.add_argument("--repeat", type=int, default=2, help="passes over the query list")
+    args = parser.parse_args()
+
+    urls = [f"{BASE_URL}{q}&n=0" for q in args.queries] * args.repeat
+
+    before = [timed(render_with_session, url) for url in urls]
+    report("HTMLSession", before)
+
+    pool = BrowserPool()
+    try:
+        after = [timed(pool.render, url) for url in urls]
+    finally:
+        pool.shutdown()
+    report("BrowserPool", after)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Favorites store against the original favorites.json code: time to add N
+stations one by one, then N duplicate checks and a full listing.
+
+    python benchmarks/bench_favorites.py [--count N]
+
+Runs in a temporary directory; nothing under the real data directory is touched.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from favorites import FavoritesStore  # noqa: E402
+
+
+def _station(i):
+    return {"name": f"Station {i}", "location": f"City {i % 97}", "genre": "Pop", "description": "",
+            "streams": [{"codec": "mp3", "bitrate": "128 kbps", "url": f"http://example.com/{i}"}]}
+
+
+class LegacyJson:
+    """The original favorites.py cycle: load the whole file, scan for duplicates, rewrite it."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r") as f:
+            try:
+                return json.load(f)
+            except json.JSONDecodeError:
+                return []
+
+    def add(self, station):
+        favorites = self.load()
+        if any(f["name"] == station["name"] and f.get("location") == station.get("location") for f in favorites):
+            return False
+        favorites.append(station)
+        with open(self.path, "w") as f:
+            json.dump(favorites, f, indent=2)
+        return True
+
+
+def run(store, count):
+    stations = [_station(i) for i in range(count)]
+    t0 = time.perf_counter()
+    for st in stations:
+        store.add(st)
+    t1 = time.perf_counter()
+    for st in stations:
+        store.add(st)
+    t2 = time.perf_counter()
+    listed = len(store.load() if isinstance(store, LegacyJson) else store.all())
+    t3 = time.perf_counter()
+    assert listed == count, listed
+    return t1 - t0, t2 - t1, t3 - t2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = [("favorites.json", run(LegacyJson(os.path.join(tmp, "favorites.json")), args.count)),
+                ("FavoritesStore", run(FavoritesStore(os.path.join(tmp, "favorites.sqlite3")), args.count))]
+
+    print(f"{args.count} favorites")
+    print(f"{'':16} {'add all':>10} {'dup checks':>12} {'list':>10}")
+    for name, (add, dup, listing) in rows:
+        print(f"{name:16} {add * 1000:8.0f}ms {dup * 1000:10.1f}ms {listing * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Playback history: reload time of a large log against a budget, append
+throughput with batched fsync, and the recent / most played queries.
+
+    python benchmarks/bench_history.py [--entries N] [--budget SECONDS]
+
+Exits non-zero if reloading the log takes longer than the budget.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from history import PlaybackHistory  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed for a reload")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.jsonl")
+        writer = PlaybackHistory(path, max_entries=args.entries)
+        start = time.perf_counter()
+        for _ in range(args.entries):
+            i = rng.randrange(args.stations)
+            entry = writer.start({"name": f"Station {i}", "location": f"City {i % 31}"},
+                                 {"url": f"http://example.com/{i}", "codec": "mp3", "bitrate": "128 kbps"})
+            writer.finish(entry)
+        writer.close()
+        append = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        reader = PlaybackHistory(path, max_entries=args.entries)
+        loaded = len(reader)
+        reload = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reader.recent(20)
+        reader.recently_played(10)
+        top = reader.most_played(10)
+        query = time.perf_counter() - start
+
+    print(f"append:  {args.entries} entries in {append:.2f}s ({args.entries / append:,.0f}/s), log {size / 1e6:.1f} MB")
+    print(f"reload:  {loaded} entries in {reload * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    print(f"queries: recent + recently played + most played in {query * 1000:.2f} ms; top: {top[0]['name']} "
+          f"({top[0]['plays']} plays)")
+    if loaded != args.entries:
+        print(f"FAIL: expected {args.entries} entries")
+        return 1
+    if reload > args.budget:
+        print("FAIL: reload over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
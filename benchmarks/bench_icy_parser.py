@@ -0,0 +1,99 @@
+"""
+Throughput of icy.IcyParser on a synthetic ICY stream, in MB/s, for a range
+of chunk sizes. A 320 kbps stream is 0.04 MB/s.
+
+    python benchmarks/bench_icy_parser.py [--megabytes 64] [--metaint 16000]
+
+First checks parse_metadata on metadata blocks seen in the wild and exits
+non-zero if any of them is decoded wrongly.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from icy import IcyParser, parse_metadata  # noqa: E402
+
+STREAM_320K = 320_000 / 8 / 1e6  # MB/s
+
+# (metadata block, expected fields)
+METADATA_CASES = [
+    (b"StreamTitle='Artist - Track';StreamUrl='';\x00\x00", {"StreamTitle": "Artist - Track", "StreamUrl": ""}),
+    (b"StreamTitle='a'; StreamUrl='b';", {"StreamTitle": "a", "StreamUrl": "b"}),
+    (b"StreamTitle='a';\r\nStreamUrl='b';\n", {"StreamTitle": "a", "StreamUrl": "b"}),
+    (b"StreamTitle='Guns N' Roses - Don't Cry';StreamUrl='http://x/?a=1;b=2';",
+     {"StreamTitle": "Guns N' Roses - Don't Cry", "StreamUrl": "http://x/?a=1;b=2"}),
+    ("StreamTitle='Céline Dion - Pour que tu m'aimes encore';".encode("latin-1"),
+     {"StreamTitle": "Céline Dion - Pour que tu m'aimes encore"}),
+    (b"", {}),
+]
+
+
+def check_metadata():
+    """Print every metadata case parse_metadata gets wrong. Returns how many."""
+    failures = 0
+    for block, expected in METADATA_CASES:
+        actual = parse_metadata(block)
+        if actual != expected:
+            failures += 1
+            print(f"MISMATCH {block!r}: {actual!r} != {expected!r}")
+    return failures
+
+
+def synthetic_stream(megabytes, metaint, title_every=20):
+    """Audio filler with a metadata block after every metaint bytes; titles change periodically."""
+    out = bytearray()
+    audio = bytes(range(256)) * (metaint // 256 + 1)
+    interval = 0
+    while len(out) < megabytes * 1_000_000:
+        out += audio[:metaint]
+        if interval % title_every == 0:
+            block = f"StreamTitle='Artist {interval} - Track';StreamUrl='http://example.com/{interval}';".encode()
+            blocks = (len(block) + 15) // 16
+            out.append(blocks)
+            out += block.ljust(blocks * 16, b"\x00")
+        else:
+            out.append(0)
+        interval += 1
+    return bytes(out)
+
+
+def run(data, metaint, chunk):
+    sink_bytes = 0
+
+    def on_audio(view):
+        nonlocal sink_bytes
+        sink_bytes += len(view)
+
+    titles = []
+    parser = IcyParser(metaint, on_audio=on_audio, on_metadata=titles.append)
+    view = memoryview(data)
+    start = time.perf_counter()
+    for pos in range(0, len(data), chunk):
+        parser.feed(view[pos:pos + chunk])
+    elapsed = time.perf_counter() - start
+    return elapsed, sink_bytes, len(titles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=int, default=64)
+    parser.add_argument("--metaint", type=int, default=16000)
+    args = parser.parse_args()
+
+    failures = check_metadata()
+    print(f"parse_metadata: {len(METADATA_CASES) - failures}/{len(METADATA_CASES)} cases decoded correctly")
+    data = synthetic_stream(args.megabytes, args.metaint)
+    print(f"{len(data) / 1e6:.1f} MB synthetic stream, metaint={args.metaint}")
+    print(f"{'chunk':>8}{'MB/s':>12}{'x 320kbps':>14}{'titles':>8}")
+    for chunk in (512, 4096, 16384, 65536):
+        elapsed, audio, titles = run(data, args.metaint, chunk)
+        rate = len(data) / 1e6 / elapsed
+        print(f"{chunk:>8}{rate:>12.1f}{rate / STREAM_320K:>14.0f}{titles:>8}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Parity check and microbenchmark: station_parser (lxml) against the original
+BeautifulSoup/html.parser loop from search_stations.
+
+    python benchmarks/bench_parser.py [--rounds N]
+
+Exits non-zero if the two parsers disagree on any fixture.
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from station_parser import parse_results  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+def reference_parse(html):
+    """The pre-lxml parsing code from search.search_stations, kept verbatim."""
+    soup = BeautifulSoup(html, "html.parser")
+    stations = []
+
+    for block in soup.select("div.stnblock"):
+        name = block.select_one("h3.stn").text.strip() if block.select_one("h3.stn") else "Unknown Station"
+        location = block.select_one(".loc").text.strip() if block.select_one(".loc") else "Unknown Location"
+        genre = block.select_one(".sty").text.strip() if block.select_one(".sty") else "Unknown Genre"
+        desc = block.select_one(".desc").text.strip() if block.select_one(".desc") else ""
+
+        streams = []
+        for sq in block.select(".sqdiv .sq"):
+            url = sq.get("title")
+            codec = sq.select_one(".cn").text.strip() if sq.select_one(".cn") else "Unknown"
+            bitrate = sq.select_one(".br").text.strip() + " kbps" if sq.select_one(".br") else "Unknown"
+            if url:
+                streams.append({"url": url, "codec": codec, "bitrate": bitrate})
+
+        if streams:
+            stations.append({
+                "name": name,
+                "location": location,
+                "genre": genre,
+                "description": desc,
+                "streams": streams
+            })
+
+    prev_link = None
+    next_link = None
+    footer = soup.select_one("footer#footer")
+    if footer:
+        prev_tag = footer.select_one('a.btn.arrbtn:contains("←")')
+        next_tag = footer.select_one('a.btn.arrbtn:contains("→")')
+        if prev_tag and "n=" in prev_tag.get("href", ""):
+            prev_link = int(re.search(r"n=(\d+)", prev_tag["href"]).group(1))
+        if next_tag and "n=" in next_tag.get("href", ""):
+            next_link = int(re.search(r"n=(\d+)", next_tag["href"]).group(1))
+
+    return stations, prev_link, next_link
+
+
+def best_of(fn, html, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'fixture':<24}{'stations':>9}{'bs4':>11}{'lxml':>11}{'speedup':>9}")
+    for path in sorted(FIXTURES.glob("search_*.html")):
+        html = path.read_text(encoding="utf-8")
+        expected = reference_parse(html)
+        actual = parse_results(html)
+        status = "" if actual == expected else "  MISMATCH"
+        failures += bool(status)
+
+        old = best_of(reference_parse, html, args.rounds)
+        new = best_of(parse_results, html, args.rounds)
+        print(f"{path.name:<24}{len(actual[0]):>9}{old * 1000:>9.2f}ms{new * 1000:>9.2f}ms{old / new:>8.1f}x{status}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
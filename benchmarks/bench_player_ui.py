@@ -0,0 +1,117 @@
+"""
+CPU cost of the player view while nothing happens: the original 0.3 s
+polling loop against the event-driven run_player_view, each drawing to a
+terminal console that writes to /dev/null while a stand-in process idles.
+
+    python benchmarks/bench_player_ui.py [--seconds N]
+
+Reports CPU seconds per hour of idle playback, extrapolated from N seconds.
+"""
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from rich.console import Console  # noqa: E402
+from rich.live import Live  # noqa: E402
+from rich.panel import Panel  # noqa: E402
+from backends import Playback  # noqa: E402
+from player import Wakeup, run_player_view  # noqa: E402
+
+
+def reference_view(process, source, metadata, status, stopped, out):
+    """The pre-event-driven loop from play_stream_ffplay, kept verbatim apart from `out`."""
+    animation = itertools.cycle(["▰▱▱▱▱", "▰▰▱▱▱", "▰▰▰▱▱", "▰▰▰▰▱", "▰▰▰▰▰", "▱▰▰▰▰"])
+    with Live(console=out, refresh_per_second=5) as live:
+        while not stopped.is_set() and process.poll() is None:
+            bar = next(animation)
+
+            state = status["state"]
+            if state == "playing":
+                state_label = "[green]▶️ Playing[/]"
+            elif state == "paused":
+                state_label = "[yellow]⏸️ Paused[/]"
+            else:
+                state_label = "[red]⏹️ Stopped[/]"
+
+            panel = Panel.fit(
+                f"{state_label}\n\n"
+                f"[cyan]{metadata.get('stream_name')}[/]\n"
+                f"[green]Genre: {metadata.get('stream_genre')}[/]\n"
+                f"[magenta]Bitrate: {metadata.get('stream_bitrate')} kbps[/]\n\n"
+                f"[bold white]♪ {metadata.get('current_title')}[/]\n\n"
+                f"[dim]{bar} Streaming...[/]\n"
+                f"[dim]Controls: (p) Pause  (r) Resume  (s) Stop  (b) Back[/]",
+                title="🎧 FMStream Player",
+                border_style="bright_blue"
+            )
+            live.update(panel)
+            time.sleep(0.3)
+
+
+class IdlePlayback(Playback):
+    """A backend stand-in: a process that just sleeps."""
+
+    backend = "idle"
+
+    def __init__(self, process):
+        super().__init__("idle://", lambda fields: None)
+        self.process = process
+
+    def poll(self):
+        return self.process.poll()
+
+    def wait(self):
+        return self.process.wait()
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def stop(self):
+        self.process.terminate()
+
+
+def measure(name, view, seconds):
+    metadata = {"stream_name": "Fake FM", "stream_genre": "Test", "stream_bitrate": "128",
+                "current_title": "Fake Artist - Track 1"}
+    process = subprocess.Popen(["sleep", str(seconds)])
+    with open(os.devnull, "w") as devnull:
+        out = Console(file=devnull, force_terminal=True, width=100)
+        wall, cpu = time.monotonic(), time.process_time()
+        view(process, metadata, out)
+        wall, cpu = time.monotonic() - wall, time.process_time() - cpu
+    print(f"{name:28} {cpu:6.3f}s CPU in {wall:5.1f}s → {cpu / wall * 3600:7.1f} CPU s per idle hour")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    def old(process, metadata, out):
+        reference_view(process, None, metadata, {"state": "playing"}, threading.Event(), out)
+
+    def new(tick):
+        def view(process, metadata, out):
+            wakeup = Wakeup()
+            run_player_view(IdlePlayback(process), metadata, {"state": "playing"}, threading.Event(),
+                            threading.Event(), wakeup, tick=tick, out=out)
+            wakeup.close()
+        return view
+
+    measure("polling loop (before)", old, args.seconds)
+    measure("event-driven, 1 s tick", new(1.0), args.seconds)
+    measure("event-driven, no animation", new(0), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
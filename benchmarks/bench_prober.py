@@ -0,0 +1,75 @@
+"""
+Run prober.probe_streams against local fake Icecast servers with known
+characteristics and print the measurements and the auto-picked stream.
+Exits 1 unless the pick is the fast 128k stream: the highest bitrate that
+keeps up, and of the two 128k streams the one without the slow start.
+
+    python benchmarks/bench_prober.py [--window 2]
+"""
+import argparse
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from prober import probe_streams, pick_best  # noqa: E402
+from fake_icecast import FakeIcecast  # noqa: E402
+
+
+EXPECTED = 2  # "128k, fast"
+
+
+def unused_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--window", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # (description, advertised stream, server settings)
+    cases = [
+        ("64k, fast", {"codec": "MP3", "bitrate": "64 kbps"}, dict(bitrate=64)),
+        ("128k, 300 ms slow start", {"codec": "MP3", "bitrate": "128 kbps"}, dict(bitrate=128, header_delay=0.3)),
+        ("128k, fast", {"codec": "MP3", "bitrate": "128 kbps"}, dict(bitrate=128)),
+        ("320k advertised, 96k delivered", {"codec": "MP3", "bitrate": "320 kbps"}, dict(bitrate=96, icy_br=320)),
+        ("AAC advertised, mpeg served", {"codec": "AAC", "bitrate": "96 kbps"}, dict(bitrate=96)),
+    ]
+    servers = [FakeIcecast(**settings).start() for _, _, settings in cases]
+    streams = [dict(stream, url=server.url) for (_, stream, _), server in zip(cases, servers)]
+    streams.append({"codec": "MP3", "bitrate": "192 kbps", "url": f"http://127.0.0.1:{unused_port()}/dead"})
+    labels = [label for label, _, _ in cases] + ["nothing listening"]
+
+    start = time.perf_counter()
+    results = probe_streams(streams, window=args.window, timeout=2)
+    elapsed = time.perf_counter() - start
+    for server in servers:
+        server.stop()
+
+    print(f"{'stream':<34}{'connect':>9}{'ttfb':>9}{'kbps':>8}  checks")
+    for label, r in zip(labels, results):
+        if not r["ok"]:
+            print(f"{label:<34}{'':>26}  failed: {r['error']}")
+            continue
+        checks = []
+        if r["bitrate_match"] is False:
+            checks.append(f"icy-br {r['icy_br']}")
+        if r["codec_match"] is False:
+            checks.append(f"type {r['content_type']}")
+        print(f"{label:<34}{r['connect_ms']:>7.1f}ms{r['ttfb_ms']:>7.1f}ms{r['kbps']:>8.0f}  {', '.join(checks) or 'ok'}")
+
+    best = pick_best(streams, results)
+    print(f"\n{len(streams)} streams probed concurrently in {elapsed:.2f}s; "
+          f"auto-pick: {labels[best] if best is not None else 'none'}")
+    if best != EXPECTED:
+        print(f"expected auto-pick: {labels[EXPECTED]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
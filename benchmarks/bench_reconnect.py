@@ -0,0 +1,72 @@
+"""
+How long playback is silent when the stream drops or stalls: the
+supervisor reconnecting against local fake Icecast stations that close
+(drop) or stop sending on (stall) every connection after a few seconds.
+
+    python benchmarks/bench_reconnect.py [--backend ffplay|vlc] [--seconds N] [--stall-timeout S]
+
+Reports reconnects and the seconds without audio from each detection to
+the next first audio (a stall is only detected after --stall-timeout).
+Backends that cannot start here are reported and skipped.
+"""
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from backends import BACKENDS  # noqa: E402
+from fake_icecast import FakeIcecast  # noqa: E402
+from supervisor import Supervisor, watch  # noqa: E402
+
+
+def run(backend, url, fallback, seconds, stall_timeout):
+    """Keep `url` playing for `seconds` like `fmcli play` does. Returns the supervisor's stats."""
+    supervisor = Supervisor({"url": url}, [{"url": fallback}], attempts=100, reset_after=1)
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        playback = backend.play(url, lambda fields: None)
+        reason = watch(playback, stall_timeout)
+        playback.stop()
+        stream, delay = supervisor.next(playback, reason)
+        url = stream["url"]
+        time.sleep(delay)
+    backend.close()
+    return supervisor.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="ffplay", choices=sorted(BACKENDS))
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--stall-timeout", type=float, default=2)
+    args = parser.parse_args()
+
+    if args.backend == "ffplay" and not shutil.which("ffplay"):
+        print("skipped: ffplay not on PATH")
+        return
+    try:
+        BACKENDS[args.backend]().close()
+    except (ImportError, RuntimeError) as e:
+        print(f"skipped: {e}")
+        return
+
+    fallback = FakeIcecast(name="Fallback").start()
+    try:
+        for scenario, options in (("drop", {"drop_after": 3}), ("stall", {"stall_after": 3})):
+            station = FakeIcecast(**options).start()
+            try:
+                stats = run(BACKENDS[args.backend](), station.url, fallback.url, args.seconds, args.stall_timeout)
+            finally:
+                station.stop()
+            per = stats["downtime"] / stats["reconnects"] if stats["reconnects"] else 0
+            print(f"{scenario:6} {stats['reconnects']:3d} reconnects ({stats['failovers']} failovers) · "
+                  f"{stats['downtime']:5.1f}s without audio · {per:4.2f}s per reconnect")
+    finally:
+        fallback.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Recording several 320 kbps streams at once: CPU used by fmcli's demuxers and
+recorders, and whether the disk writes keep up with the network.
+
+    python benchmarks/bench_recorder.py [--streams N] [--seconds S] [--speed X] [--write-kb K ...]
+
+The fake stations run in a separate process so only the client side is
+measured. --speed multiplies the stream rate (e.g. 10 = ten times real time)
+to find the headroom; each --write-kb value is a separate run.
+"""
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from fake_icecast import FakeIcecast  # noqa: E402
+from icy import IcyDemuxer  # noqa: E402
+from recorder import Recorder  # noqa: E402
+
+
+def serve(count, bitrate, conn):
+    stations = [FakeIcecast(bitrate=bitrate, title_every=5, name=f"Fake {i + 1}").start() for i in range(count)]
+    conn.send([s.url for s in stations])
+    conn.recv()  # until the benchmark is done
+    for station in stations:
+        station.stop()
+
+
+def run(urls, seconds, write_kb, directory):
+    recorders = [Recorder(f"Fake {i + 1}", url, directory, write_size=write_kb * 1024)
+                 for i, url in enumerate(urls)]
+    demuxers = [IcyDemuxer(url, None, recorder=recorder) for url, recorder in zip(urls, recorders)]
+    wall, cpu = time.monotonic(), time.process_time()
+    for demuxer in demuxers:
+        demuxer.start()
+    time.sleep(seconds)
+    for demuxer in demuxers:
+        demuxer.stop()
+    for recorder in recorders:
+        recorder.close()
+    wall, cpu = time.monotonic() - wall, time.process_time() - cpu
+    stats = [r.stats() for r in recorders]
+    return wall, cpu, sum(s["bytes"] for s in stats), sum(s["dropped_bytes"] for s in stats), \
+        sum(s["tracks"] for s in stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--bitrate", type=int, default=320, help="kbps")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--speed", type=float, default=1, help="stream rate multiplier")
+    parser.add_argument("--write-kb", type=int, action="append", help="default: 256 (and 4 for comparison)")
+    args = parser.parse_args()
+
+    ours, theirs = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(args.streams, int(args.bitrate * args.speed), theirs),
+                                     daemon=True)
+    server.start()
+    urls = ours.recv()
+    directory = tempfile.mkdtemp(prefix="fmcli-bench-recorder-")
+    expected = args.streams * args.bitrate * args.speed * 1000 / 8 * args.seconds
+    try:
+        for write_kb in args.write_kb or [4, 256]:
+            wall, cpu, written, dropped, tracks = run(urls, args.seconds, write_kb, directory)
+            print(f"{args.streams} × {args.bitrate} kbps × {args.speed:g}, {write_kb:4d} KiB writes: "
+                  f"{cpu / wall * 100:5.1f}% of one core · {written / 1e6:6.1f} MB in {tracks} files "
+                  f"({written / expected * 100:3.0f}% of the stream) · {dropped / 1e6:.1f} MB dropped")
+    finally:
+        ours.send("done")
+        server.join(timeout=5)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
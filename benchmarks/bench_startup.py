@@ -0,0 +1,38 @@
+"""
+Time-to-menu regression check: launch the CLI until the main menu has been
+drawn and fail if the median exceeds the budget. Also fails if any of the
+modules that should load lazily were imported on the way.
+
+    python benchmarks/bench_startup.py [--budget 0.35] [--runs 7]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+from startup import import_profile, time_to_menu  # noqa: E402
+
+# Only needed once the user searches or plays something.
+LAZY = ("requests", "requests_html", "pyppeteer", "lxml", "bs4", "sqlite3", "asyncio",
+        "search", "player", "browser", "icy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=0.35, help="seconds")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    loaded = {name for name, _, _, _ in import_profile()}
+    eager = sorted(m for m in LAZY if m in loaded)
+    median = time_to_menu(args.runs)
+
+    print(f"time to menu: {median * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    if eager:
+        print(f"imported before the menu but meant to be lazy: {', '.join(eager)}")
+    sys.exit(1 if median > args.budget or eager else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of the span instrumentation: nanoseconds per span() block and per
+@traced call with tracing disabled (the default) and enabled.
+
+    python benchmarks/bench_tracing.py [--calls N] [--budget NS]
+
+Fails if a disabled span or traced call costs more than --budget ns over
+the bare code it wraps.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fmcli"))
+
+import tracing  # noqa: E402
+
+
+def per_call(func, calls):
+    """Best of three: nanoseconds per call of func."""
+    best = None
+    for _ in range(3):
+        tracing.reset()
+        start = time.perf_counter_ns()
+        func(calls)
+        elapsed = (time.perf_counter_ns() - start) / calls
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def work():
+    return None
+
+
+@tracing.traced("bench.traced")
+def traced_work():
+    return None
+
+
+def bare(calls):
+    for _ in range(calls):
+        work()
+
+
+def spans(calls):
+    for _ in range(calls):
+        with tracing.span("bench.span"):
+            work()
+
+
+def traced(calls):
+    for _ in range(calls):
+        traced_work()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--budget", type=float, default=1000, help="ns per disabled span over bare code")
+    args = parser.parse_args()
+
+    baseline = per_call(bare, args.calls)
+    disabled = {"span": per_call(spans, args.calls) - baseline, "traced": per_call(traced, args.calls) - baseline}
+    tracing.enable()
+    enabled = {"span": per_call(spans, args.calls) - baseline, "traced": per_call(traced, args.calls) - baseline}
+
+    for kind in ("span", "traced"):
+        print(f"{kind:6}  disabled {disabled[kind]:6.0f} ns · enabled {enabled[kind]:6.0f} ns per call")
+    over = [kind for kind, ns in disabled.items() if ns > args.budget]
+    if over:
+        print(f"over budget ({args.budget:.0f} ns) while disabled: {', '.join(over)}")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Local stand-in for an Icecast/SHOUTcast server, for exercising fmcli's
+network code without a live radio stream.
+
+Every connection gets an endless stream paced at `bitrate` kbps. When the
+client sends `Icy-MetaData: 1` a metadata block is interleaved every
+`metaint` bytes and StreamTitle changes every `title_every` seconds.
+`drop_after` closes each connection after that many seconds and
+`stall_after` stops sending on it (but keeps it open), to exercise
+reconnects. `throttle_kbps` caps each connection below the bitrate, like
+a constrained link; it can be changed while clients are connected.
+`flavor` picks the response headers of an Icecast 2 or a SHOUTcast DNAS
+server.
+
+    python benchmarks/fake_icecast.py --port 8000 --bitrate 128 --metaint 16000
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+
+class FakeIcecast:
+    def __init__(self, host="127.0.0.1", port=0, bitrate=128, metaint=16000, title_every=10.0,
+                 content_type="audio/mpeg", icy_br=None, header_delay=0.0, name="Fake FM", drop_after=None,
+                 stall_after=None, throttle_kbps=None, flavor="icecast"):
+        self.host = host
+        self.port = port
+        self.bitrate = bitrate
+        self.metaint = metaint
+        self.title_every = title_every
+        self.content_type = content_type
+        self.icy_br = icy_br if icy_br is not None else bitrate
+        self.header_delay = header_delay
+        self.name = name
+        self.drop_after = drop_after
+        self.stall_after = stall_after
+        self.throttle_kbps = throttle_kbps
+        self.flavor = flavor
+        self.connections = 0
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/stream"
+
+    def _title(self, started):
+        return f"Fake Artist - Track {int((time.monotonic() - started) // self.title_every) + 1}"
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            want_meta = b"icy-metadata: 1" in request.lower()
+            await asyncio.sleep(self.header_delay)
+
+            headers = ["HTTP/1.0 200 OK", f"Content-Type: {self.content_type}"]
+            if self.flavor == "shoutcast":
+                headers += ["icy-notice1: <BR>This stream requires <a href=\"http://www.winamp.com\">Winamp</a><BR>",
+                            "icy-notice2: SHOUTcast DNAS/posix(linux x64) v2.6.1.777<BR>", "icy-pub: 1"]
+            else:
+                headers += ["Server: Icecast 2.4.4", "Cache-Control: no-cache, no-store",
+                            f"ice-audio-info: bitrate={self.icy_br}"]
+            headers += [f"icy-name: {self.name}", "icy-genre: Test", f"icy-br: {self.icy_br}"]
+            if want_meta and self.metaint:
+                headers.append(f"icy-metaint: {self.metaint}")
+            writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1"))
+
+            await self._stream(writer, want_meta and self.metaint)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(self, writer, metaint):
+        started = time.monotonic()
+        bytes_per_tick = max(1, self.bitrate * 1000 // 8 // 20)  # 20 writes per second
+        filler = bytes(range(256)) * (bytes_per_tick // 256 + 1)
+        until_meta = metaint
+        last_title = None
+        next_at = started
+        while True:
+            chunk = memoryview(filler)[:bytes_per_tick]
+            while chunk:
+                if metaint and until_meta == 0:
+                    title = self._title(started)
+                    if title != last_title:
+                        block = f"StreamTitle='{title}';StreamUrl='';".encode()
+                        blocks = (len(block) + 15) // 16
+                        writer.write(bytes([blocks]) + block.ljust(blocks * 16, b"\x00"))
+                        last_title = title
+                    else:
+                        writer.write(b"\x00")
+                    until_meta = metaint
+                take = min(len(chunk), until_meta) if metaint else len(chunk)
+                writer.write(chunk[:take])
+                chunk = chunk[take:]
+                until_meta -= take if metaint else 0
+            await writer.drain()
+            now = time.monotonic()
+            if self.drop_after is not None and now - started >= self.drop_after:
+                return
+            if self.stall_after is not None and now - started >= self.stall_after:
+                await asyncio.Event().wait()  # until the client gives up
+            # Pace against the wall clock so throughput matches the bitrate (or the throttle). A client
+            # that fell behind catches up by half a second at most, like on a real link.
+            rate = min(self.bitrate, self.throttle_kbps or self.bitrate)
+            next_at = max(next_at + bytes_per_tick / (rate * 1000 / 8), now - 0.5)
+            if next_at > now:
+                await asyncio.sleep(next_at - now)
+
+    async def start_async(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    def start(self):
+        """Run the server on a background thread (for synchronous callers). Returns self."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.start_async())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-icecast", daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+
+        async def close():
+            self._server.close()
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._loop.stop()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop)
+        self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--bitrate", type=int, default=128, help="kbps")
+    parser.add_argument("--metaint", type=int, default=16000)
+    parser.add_argument("--title-every", type=float, default=10.0, help="seconds between title changes")
+    parser.add_argument("--content-type", default="audio/mpeg")
+    parser.add_argument("--drop-after", type=float, help="close each connection after this many seconds")
+    parser.add_argument("--stall-after", type=float, help="stop sending on each connection after this many seconds")
+    parser.add_argument("--throttle", type=float, help="cap each connection at this many kbps")
+    parser.add_argument("--flavor", choices=("icecast", "shoutcast"), default="icecast", help="response headers")
+    args = parser.parse_args()
+
+    async def serve():
+        server = FakeIcecast(args.host, args.port, args.bitrate, args.metaint, args.title_every, args.content_type,
+                             drop_after=args.drop_after, stall_after=args.stall_after, throttle_kbps=args.throttle,
+                             flavor=args.flavor)
+        await server.start_async()
+        print(f"Serving {server.url}")
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
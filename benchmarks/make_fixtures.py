@@ -0,0 +1,102 @@
+"""
+Regenerate the fmstream.org result-page fixtures in benchmarks/fixtures/.
+
+The pages reproduce the markup search_stations relies on (div.stnblock,
+h3.stn, .loc, .sty, .desc, .sqdiv .sq[title] with .cn/.br, and the
+footer#footer arrow buttons), including the irregular cases seen on the
+live site: missing fields, streams without a URL or bitrate, stations with
+no playable stream, entities and stray whitespace.
+
+    python benchmarks/make_fixtures.py
+"""
+import html
+import random
+from pathlib import Path
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+GENRES = ["Jazz", "Urban-Contemporary", "News-Talk", "Classical", "Rock", "Pop", "Country", "Gospel", "Electronic"]
+PLACES = ["Berlin, brb, Germany", "Accra, Ghana", "Paris, IDF, France", "Austin, TX, USA", "Lagos, Nigeria",
+          "São Paulo, SP, Brazil", "Osaka, Japan", "Montréal, QC, Canada"]
+CODECS = [("MP3", ["64", "128", "192", "320"]), ("AAC", ["48", "64", "96"]), ("AAC+", ["32", "48"]),
+          ("OGG", ["112", "160"])]
+
+
+def _stream(rng, n):
+    codec, rates = rng.choice(CODECS)
+    rate = rng.choice(rates)
+    host = f"stream{rng.randint(1, 40)}.example-radio.net"
+    url = f"https://{host}:{rng.choice([80, 8000, 8443])}/live{n}.{codec.lower().rstrip('+')}"
+    parts = [f'<div class="sq" title="{html.escape(url)}">']
+    if rng.random() > 0.05:
+        parts.append(f'<span class="cn">{codec}</span>')
+    if rng.random() > 0.08:
+        parts.append(f'<span class="br"> {rate} </span>')
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def _station(rng, i):
+    name = f"Radio {rng.choice(['Sol', 'Nova', 'Kiss', 'Metro', 'Peace', 'Joy', 'Def Jay'])} {i} &amp; Friends"
+    out = [f'<div class="stnblock" id="s{i}">', '<div class="stnhead">']
+    out.append(f'<h3 class="stn">\n      {name}\n    </h3>')
+    if rng.random() > 0.1:
+        out.append(f'<span class="loc">{html.escape(rng.choice(PLACES))}</span>')
+    out.append("</div>")
+    if rng.random() > 0.1:
+        out.append(f'<div class="sty">{rng.choice(GENRES)}</div>')
+    if rng.random() > 0.3:
+        out.append(f'<div class="desc">The <b>best</b> {rng.choice(GENRES).lower()} &mdash; 24/7</div>')
+
+    out.append('<div class="sqdiv">')
+    if rng.random() > 0.04:  # a few stations list nothing playable and must be dropped
+        for n in range(rng.randint(1, 5)):
+            out.append(_stream(rng, n))
+    if rng.random() < 0.1:
+        out.append('<div class="sq"><span class="cn">MP3</span><span class="br">96</span></div>')  # no URL
+    out.append("</div>")
+    if rng.random() < 0.05:
+        # .sq outside .sqdiv is not a stream
+        out.append('<div class="sq" title="http://ignored.example/stream"><span class="cn">MP3</span></div>')
+    out.append("</div>")
+    return "\n".join(out)
+
+
+def _footer(query, start, page_size, total):
+    links = []
+    if start > 0:
+        links.append(f'<a class="btn arrbtn" href="index.php?s={query}&amp;n={max(0, start - page_size)}">←</a>')
+    links.append('<a class="btn" href="index.php?s=&amp;n=0">Home</a>')
+    if start + page_size < total:
+        links.append(f'<a class="btn arrbtn" href="index.php?s={query}&amp;n={start + page_size}">→</a>')
+    return f'<footer id="footer"><div class="nav">{" ".join(links)}</div></footer>'
+
+
+def make_page(seed, query, count, start, total):
+    rng = random.Random(seed)
+    blocks = "\n".join(_station(rng, start + i) for i in range(count))
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>fmstream.org - {query}</title></head>\n<body>\n"
+        '<header id="header"><a class="btn arrbtn" href="index.php?n=999">→</a></header>\n'
+        f'<div id="stns">\n{blocks}\n</div>\n'
+        f"{_footer(query, start, count, total)}\n</body></html>\n"
+    )
+
+
+PAGES = {
+    "search_small.html": dict(seed=1, query="defjay", count=6, start=0, total=6),
+    "search_paginated.html": dict(seed=2, query="jazz", count=20, start=20, total=120),
+    "search_large.html": dict(seed=3, query="radio", count=400, start=0, total=4000),
+}
+
+
+def main():
+    FIXTURES.mkdir(exist_ok=True)
+    for name, params in PAGES.items():
+        (FIXTURES / name).write_text(make_page(**params), encoding="utf-8")
+        print(f"wrote {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Offline benchmark suite: result-page parsing and search, the ICY metadata
+path and player startup, all against the saved fixtures and local fake
+Icecast servers. Results are saved per commit so runs can be compared.
+
+    python benchmarks/suite.py [--rounds N] [--only parse|icy|player|startup ...] [--compare [REF]] [--threshold PCT] [--no-save]
+
+Each metric is the median of --rounds runs. Results go to
+benchmarks/results/<commit>.json (<commit>-dirty.json with uncommitted
+changes). --compare prints the change against the results of REF (a
+commit or a results file; default: the newest other results file) and
+exits non-zero if any metric got worse by more than --threshold percent.
+"""
+import argparse
+import datetime
+import gc
+import http.server
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+ROOT = HERE.parent
+RESULTS = HERE / "results"
+FIXTURES = HERE / "fixtures"
+
+# Nothing may reach the network or the user's data: no cache or index writes, static fetches only
+os.environ.update(FMCLI_CACHE="0", FMCLI_INDEX="0", FMCLI_PREFETCH="0", FMCLI_SEARCH_MODE="static")
+sys.path.insert(0, str(ROOT / "fmcli"))
+
+from bench_icy_parser import synthetic_stream  # noqa: E402
+from fake_icecast import FakeIcecast  # noqa: E402
+
+
+def median_of(rounds, fn):
+    """Median wall time of fn() over `rounds` runs, in seconds, with the collector kept out of the way."""
+    samples = []
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return statistics.median(samples)
+
+
+class _FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serves benchmarks/fixtures/search_<s>.html for index.php?s=<s>, kept alive like fmstream.org."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # headers and body go out in separate writes; no delayed-ACK stalls
+
+    def do_GET(self):
+        query = self.path.split("s=", 1)[-1].split("&", 1)[0]
+        path = FIXTURES / f"search_{query}.html"
+        body = path.read_bytes() if path.is_file() else b""
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_parse(rounds):
+    """Parsing each fixture page, and search_stations fetching it from a local server."""
+    import search
+    from station_parser import parse_results
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    search.BASE_URL = f"http://127.0.0.1:{server.server_port}/index.php?s="
+    results = {}
+    try:
+        for path in sorted(FIXTURES.glob("search_*.html")):
+            name = path.stem[len("search_"):]
+            html = path.read_text(encoding="utf-8")
+            stations, _, _ = search.search_stations(name, quiet=True)
+            if len(stations) != len(parse_results(html)[0]):
+                raise RuntimeError(f"search_stations returned {len(stations)} stations for {path.name}")
+            results[f"parse.{name}"] = (median_of(rounds, lambda: parse_results(html)) * 1000, "ms", "lower")
+            results[f"search.{name}"] = (median_of(rounds, lambda: search.search_stations(name, quiet=True)) * 1000,
+                                         "ms", "lower")
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def bench_icy(rounds):
+    """IcyParser throughput, and fetching headers plus the first title from Icecast and SHOUTcast servers."""
+    from icy import IcyParser, fetch_icy_metadata
+
+    metaint = 16000
+    data = synthetic_stream(16, metaint)
+    view = memoryview(data)
+
+    def feed():
+        parser = IcyParser(metaint, on_audio=lambda audio: None, on_metadata=lambda fields: None)
+        for pos in range(0, len(data), 16384):
+            parser.feed(view[pos:pos + 16384])
+
+    results = {"icy.parser": (len(data) / 1e6 / median_of(rounds, feed), "MB/s", "higher")}
+    # A fast stream, so the first metadata block arrives without waiting on the bitrate pacing
+    for flavor in ("icecast", "shoutcast"):
+        station = FakeIcecast(bitrate=8000, metaint=metaint, flavor=flavor).start()
+        try:
+            def fetch():
+                meta = fetch_icy_metadata(station.url)
+                if meta.get("current_title", "N/A") == "N/A":
+                    raise RuntimeError(f"no title from the fake {flavor} server: {meta}")
+
+            results[f"icy.first_title.{flavor}"] = (median_of(rounds, fetch) * 1000, "ms", "lower")
+        finally:
+            station.stop()
+    return results
+
+
+def bench_player(rounds):
+    """Demuxer time to first audio, ffplay time to first audio (if installed) and drawing the player panel."""
+    from rich.console import Console
+    from backends import BACKENDS, Playback
+    from icy import IcyDemuxer
+    from player import _player_panel
+
+    results = {}
+    station = FakeIcecast(bitrate=320).start()
+    try:
+        def first_audio():
+            demuxer = IcyDemuxer(station.url, None)
+            demuxer.start()
+            while not demuxer.bytes_received and demuxer.is_alive():
+                time.sleep(0.0005)
+            demuxer.stop()
+
+        results["player.demux_first_audio"] = (median_of(rounds, first_audio) * 1000, "ms", "lower")
+
+        if shutil.which("ffplay"):
+            from bench_backends import _play
+
+            backend = BACKENDS["ffplay"]()
+            samples = []
+            try:
+                for _ in range(rounds):
+                    playback = _play(backend, station.url, 10)
+                    samples.append(playback.stats()["first_audio"])
+                    playback.stop()
+            finally:
+                backend.close()
+            results["player.ffplay_first_audio"] = (statistics.median(samples) * 1000, "ms", "lower")
+    finally:
+        station.stop()
+
+    class StillPlayback(Playback):
+        """Only what the panel reads: a playback that never ends."""
+
+        poll = wait = pause = resume = stop = lambda self: None
+
+    out = Console(file=open(os.devnull, "w"), force_terminal=True, width=100)
+    playback = StillPlayback("http://127.0.0.1/stream", lambda fields: None)
+    status = {"state": "playing", "supervisor": None, "adaptive": None}
+    metadata = {"stream_name": "Fake FM", "stream_genre": "Test", "stream_bitrate": "320",
+                "current_title": "Fake Artist - Track 1"}
+    results["player.panel_draw"] = (median_of(rounds * 20, lambda: out.print(
+        _player_panel(status, metadata, "▰▰▱▱▱", playback))) * 1000, "ms", "lower")
+    out.file.close()
+    return results
+
+
+def bench_startup(rounds):
+    """Wall time from interpreter launch until the menu has been drawn."""
+    from startup import time_to_menu
+
+    return {"startup.menu": (time_to_menu(rounds) * 1000, "ms", "lower")}
+
+
+BENCHMARKS = {"parse": bench_parse, "icy": bench_icy, "player": bench_player, "startup": bench_startup}
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def current_commit():
+    """(short commit id or None, True if tracked files have uncommitted changes)."""
+    commit = _git("rev-parse", "--short", "HEAD")
+    return commit, bool(_git("status", "--porcelain", "--untracked-files=no"))
+
+
+def load_reference(ref, exclude):
+    """The saved results `ref` names (results file, or commit), or the newest saved ones other than `exclude`."""
+    if ref and Path(ref).is_file():
+        return json.loads(Path(ref).read_text())
+    if ref:
+        commit = _git("rev-parse", "--short", ref) or ref
+        candidates = [RESULTS / f"{commit}.json", RESULTS / f"{commit}-dirty.json"]
+    else:
+        candidates = sorted((p for p in RESULTS.glob("*.json") if p != exclude), key=lambda p: -p.stat().st_mtime)
+    for path in candidates:
+        if path.is_file():
+            return json.loads(path.read_text())
+    return None
+
+
+def compare(reference, results, threshold):
+    """Print each metric against the reference. Returns the names that regressed by more than threshold %."""
+    print(f"\ncompared with {reference['commit']}{' (dirty)' if reference.get('dirty') else ''} "
+          f"from {reference['date']}")
+    regressions = []
+    for name, metric in results["metrics"].items():
+        old = reference["metrics"].get(name)
+        if old is None or not old["value"]:
+            print(f"  {name:30} {'new':>12}")
+            continue
+        change = (metric["value"] - old["value"]) / old["value"] * 100
+        worse = change if metric["better"] == "lower" else -change
+        verdict = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+        if verdict == "REGRESSION":
+            regressions.append(name)
+        print(f"  {name:30} {old['value']:10.2f} → {metric['value']:10.2f} {metric['unit']:5} "
+              f"{change:+7.1f}%  {verdict}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="default: all")
+    parser.add_argument("--compare", nargs="?", const="", metavar="REF",
+                        help="commit or results file to compare with (default: newest saved run)")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change that counts as a regression")
+    parser.add_argument("--no-save", action="store_true", help="do not write benchmarks/results/")
+    args = parser.parse_args()
+
+    commit, dirty = current_commit()
+    metrics = {}
+    for name in args.only or BENCHMARKS:
+        for metric, (value, unit, better) in BENCHMARKS[name](args.rounds).items():
+            metrics[metric] = {"value": round(value, 4), "unit": unit, "better": better}
+            print(f"{metric:32} {value:10.2f} {unit}")
+
+    results = {"commit": commit, "dirty": dirty, "date": datetime.datetime.now().isoformat(timespec="seconds"),
+               "rounds": args.rounds, "python": platform.python_version(), "machine": platform.platform(),
+               "metrics": metrics}
+    path = RESULTS / f"{commit or 'unknown'}{'-dirty' if dirty else ''}.json"
+    if not args.no_save:
+        RESULTS.mkdir(exist_ok=True)
+        path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"saved {path.relative_to(ROOT)}")
+
+    if args.compare is not None:
+        reference = load_reference(args.compare, path)
+        if reference is None:
+            print(f"no saved results for {args.compare or 'comparison'}")
+            sys.exit(2)
+        sys.exit(1 if compare(reference, results, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
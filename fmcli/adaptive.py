@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import deque
+import config
+from prober import advertised_kbps, probe_stream
+
+
+class AdaptiveController:
+    """
+    Moves playback between a station's bitrate variants to match the link.
+
+    check() is called about once a second while a variant plays. It samples
+    Playback.bytes_received() and steps down one variant when throughput over
+    the last `down_seconds` stays below `down_ratio` x the bitrate for that
+    long again and the buffer estimate (seconds of audio received minus
+    seconds played) cannot ride it out, or when the buffer estimate falls
+    more than `down_seconds` behind.
+
+    A live stream is paced at its own bitrate, so its throughput never shows
+    spare bandwidth. Instead, after `up_after` seconds on a variant the next
+    one up is probed in the background, and playback steps up only if the
+    probe reaches `up_ratio` x that bitrate. A failed probe, or a step up
+    that does not hold, doubles the wait (up to `up_max_wait`). Together with
+    the gap between the two ratios this keeps it from flapping.
+
+    Every switch is recorded in `events` (and passed to `on_event`) as
+    {"type": "switch", "from", "to", "url", "reason"}, bitrates in kbps.
+    """
+
+    def __init__(self, streams, current, down_ratio=config.ADAPTIVE_DOWN_RATIO,
+                 down_seconds=config.ADAPTIVE_DOWN_SECONDS, up_after=config.ADAPTIVE_UP_AFTER,
+                 up_ratio=config.ADAPTIVE_UP_RATIO, up_max_wait=config.ADAPTIVE_UP_MAX_WAIT, probe=probe_stream,
+                 on_event=None):
+        # One variant per bitrate, lowest first; the chosen stream keeps its slot
+        variants = {}
+        for stream in [current] + list(streams):
+            kbps = advertised_kbps(stream)
+            if kbps and kbps not in variants:
+                variants[kbps] = stream
+        self.variants = [variants[kbps] for kbps in sorted(variants)]
+        self.down_ratio = down_ratio
+        self.down_seconds = down_seconds
+        self.up_after = up_after
+        self.up_ratio = up_ratio
+        self.up_max_wait = up_max_wait
+        self.probe = probe
+        self.on_event = on_event or (lambda event: None)
+        self.events = []
+        self.kbps = None  # measured throughput
+        self.buffer = None  # seconds of audio received ahead of playback
+        self._up_wait = up_after
+        self._probe_thread = None
+        self._probe_result = None
+        self.start(current)
+
+    def start(self, stream):
+        """Playback of `stream` begins: measure it afresh."""
+        self.current = stream
+        self._up_from = time.monotonic()
+        self._restart()
+
+    def _restart(self):
+        self.kbps = self.buffer = None
+        self._samples = deque()  # (time.monotonic(), bytes received)
+        self._base = None  # first sample with data: the buffer estimate counts from there
+        self._short_since = None
+
+    def _level(self):
+        urls = [s["url"] for s in self.variants]
+        return urls.index(self.current["url"]) if self.current["url"] in urls else None
+
+    def check(self, playback):
+        """The variant to switch to now, or None to stay."""
+        level = self._level()
+        received = playback.bytes_received()
+        if level is None or received is None or len(self.variants) < 2:
+            return None
+
+        now = time.monotonic()
+        if self._samples and now - self._samples[-1][0] > self.down_seconds:
+            self._restart()  # not checked for a while (paused): old samples say nothing about now
+        bitrate = advertised_kbps(self.current)
+        self._samples.append((now, received))
+        # Keep one sample at least down_seconds old, so the window spans the full time
+        while len(self._samples) > 1 and now - self._samples[1][0] >= self.down_seconds:
+            self._samples.popleft()
+        oldest, oldest_bytes = self._samples[0]
+        if now > oldest:
+            self.kbps = (received - oldest_bytes) * 8 / 1000 / (now - oldest)
+        if received and self._base is None:
+            self._base = (now, received)
+        if self._base is not None:
+            self.buffer = (received - self._base[1]) * 8 / (bitrate * 1000) - (now - self._base[0])
+
+        # Short: throughput over a full window below the ratio, for another window. A probe
+        # shares the link, so its time does not count.
+        window_full = self._probe_thread is None and now - oldest >= self.down_seconds
+        if not window_full or self.kbps >= self.down_ratio * bitrate:
+            self._short_since = None
+        elif self._short_since is None:
+            self._short_since = now
+        if level > 0 and self._probe_thread is None:
+            if (self._short_since is not None and now - self._short_since >= self.down_seconds
+                    and (self.buffer or 0) < self.down_seconds):
+                return self._switch(level - 1, f"{self.kbps:.0f} kbps received")
+            if (self.buffer or 0) < -self.down_seconds:
+                # A small but steady shortfall: the player has drained more than a window of audio
+                return self._switch(level - 1, f"{-self.buffer:.0f}s of audio behind")
+        # Only a variant that is keeping up is worth probing above
+        if level < len(self.variants) - 1 and (self._probe_thread is not None or
+                                                (window_full and self._short_since is None)):
+            return self._check_up(level, now)
+        return None
+
+    def _check_up(self, level, now):
+        if self._probe_thread is None:
+            if now - self._up_from >= self._up_wait:
+                target = self.variants[level + 1]
+                self._probe_thread = threading.Thread(target=self._run_probe, args=(target,),
+                                                      name="fmcli-adaptive-probe", daemon=True)
+                self._probe_thread.start()
+            return None
+        if self._probe_thread.is_alive():
+            return None
+
+        self._probe_thread = None
+        self._samples.clear()
+        target, result = self._probe_result
+        if target is not self.variants[level + 1]:
+            return None  # probed for a variant we have since switched away from
+        if result["ok"] and (result["kbps"] or 0) >= advertised_kbps(target) * self.up_ratio:
+            return self._switch(level + 1, f"probe reached {result['kbps']:.0f} kbps")
+        self._up_wait = min(self.up_max_wait, self._up_wait * 2)
+        self._up_from = now
+        return None
+
+    def _run_probe(self, target):
+        self._probe_result = (target, self.probe(target))
+
+    def _switch(self, level, reason):
+        target = self.variants[level]
+        event = {"type": "switch", "from": advertised_kbps(self.current), "to": advertised_kbps(target),
+                 "url": target["url"], "reason": reason}
+        if event["to"] > event["from"]:
+            self._up_wait = self.up_after
+        else:
+            # A step up that did not hold makes the next attempt wait longer
+            stepped_up = self.events and self.events[-1]["to"] > self.events[-1]["from"]
+            self._up_wait = min(self.up_max_wait, self._up_wait * 2) if stepped_up else self.up_after
+        self.events.append(event)
+        self.on_event(event)
+        return target
+
+    def stats(self) -> dict:
+        return {"kbps": self.kbps, "buffer": self.buffer, "bitrate": advertised_kbps(self.current),
+                "down": sum(e["to"] < e["from"] for e in self.events),
+                "up": sum(e["to"] > e["from"] for e in self.events),
+                "probing": self._probe_thread is not None}
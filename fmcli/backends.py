@@ -0,0 +1,488 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from console_manager import console
+from icy import AUDIO_CHUNK, IcyDemuxer, MetadataWatcher
+from recorder import Recorder
+from timeshift import TimeshiftBuffer, capacity_for
+import config
+import tracing
+
+# Audio backends. A backend turns a URL into a Playback; the player view only
+# talks to the Playback interface, so ffplay and libVLC are interchangeable.
+
+
+class Playback(ABC):
+    """
+    One playing stream. `on_update` receives dicts of changed metadata fields
+    and `on_event` is called (from any thread) when audio starts or playback
+    ends, so the player loop can wake up.
+
+    Timings, in seconds from the play() call: first_audio (time to first
+    audio), switch (first audio when play() had to stop a previous stream
+    first, else None) and stop (how long stop() took).
+
+    stalled() tells a supervisor when a stream that is still "playing" has
+    stopped delivering audio.
+
+    Backends implement poll, wait, pause, resume and stop; the rest have
+    defaults for backends that cannot tell or do not support it.
+    """
+
+    backend = None
+
+    def __init__(self, url, on_update, on_event=None, bitrate=None):
+        self.url = url
+        self.bitrate = bitrate or 128  # kbps, for sizing buffers and converting bytes to seconds
+        self.on_update = on_update
+        self.on_event = on_event or (lambda: None)
+        self.started_at = time.perf_counter()
+        self.switching = False
+        self.first_audio_at = None
+        self.stop_seconds = None
+        self._error = None
+        self._created = time.monotonic()
+        self._read_errors = deque()  # monotonic times of read errors the backend reported
+
+    @property
+    def error(self):
+        """Why playback failed, if the backend knows."""
+        return self._error
+
+    def _first_audio(self):
+        if self.first_audio_at is None:
+            self.first_audio_at = time.perf_counter()
+            tracing.add("play.first_audio", self.started_at, self.first_audio_at, backend=self.backend, url=self.url)
+            self.on_event()
+
+    def fileno(self):
+        """A descriptor that becomes readable when there is output to handle, or None."""
+        return None
+
+    def on_readable(self):
+        """Handle output on fileno(). Returns False once it reached EOF."""
+        return False
+
+    @abstractmethod
+    def poll(self):
+        """None while playing, otherwise the exit code."""
+
+    @abstractmethod
+    def wait(self):
+        """Block until playback ends and return the exit code."""
+
+    @abstractmethod
+    def pause(self):
+        """Stop audio output; the stream may keep being read (see behind_live)."""
+
+    @abstractmethod
+    def resume(self):
+        """Continue audio output after pause()."""
+
+    @abstractmethod
+    def stop(self):
+        """Stop playback and release its resources. Safe to call more than once."""
+
+    def behind_live(self):
+        """Seconds the play position trails the live stream, or None without timeshift."""
+        return None
+
+    def last_progress(self):
+        """time.monotonic() when audio last arrived (or play() if none yet), or None if the backend cannot tell."""
+        return None
+
+    def bytes_received(self):
+        """Stream bytes read from the network so far, or None if the backend cannot tell."""
+        return None
+
+    def _read_error(self, count=1):
+        now = time.monotonic()
+        self._read_errors.extend([now] * count)
+
+    def stalled(self, timeout=config.STALL_SECONDS, max_errors=config.STALL_UNDERRUNS):
+        """
+        Why playback looks stuck, or None: no audio for `timeout` seconds, or
+        `max_errors` read errors/underruns reported within that time.
+        """
+        now = time.monotonic()
+        while self._read_errors and self._read_errors[0] < now - timeout:
+            self._read_errors.popleft()
+        if len(self._read_errors) >= max_errors:
+            return f"{len(self._read_errors)} read errors in {timeout:.0f}s"
+        last = self.last_progress()
+        # Audio still buffered ahead of the play position is not a stall yet
+        if last is not None and now - last >= timeout + (self.behind_live() or 0):
+            return f"no audio for {now - last:.0f}s"
+        return None
+
+    def stall_due_in(self, timeout=config.STALL_SECONDS):
+        """
+        Seconds until stalled(timeout) can report missing audio if none arrives,
+        or None if the backend cannot tell. Read errors only come with new
+        output, so they need no timer.
+        """
+        last = self.last_progress()
+        if last is None:
+            return None
+        return max(0.0, last + timeout + (self.behind_live() or 0) - time.monotonic())
+
+    def go_live(self):
+        """Skip buffered audio and continue at the live edge. Returns False if unsupported."""
+        return False
+
+    @property
+    def recorder(self):
+        """The Recorder writing this stream to disk, or None."""
+        return None
+
+    def start_recording(self, name, directory=None):
+        """Record the stream, one file per title, to a new session directory. Returns False if unsupported."""
+        return False
+
+    def stop_recording(self):
+        """Stop recording; returns the recorder's final stats, or None if it was not recording."""
+        return None
+
+    def stats(self) -> dict:
+        first = self.first_audio_at - self.started_at if self.first_audio_at else None
+        return {"first_audio": first, "switch": first if self.switching else None, "stop": self.stop_seconds}
+
+
+class FfplayPlayback(Playback):
+    """ffplay subprocess plus the metadata source of the configured player mode."""
+
+    backend = "ffplay"
+    # What ffplay logs when its own connection (direct mode) or the audio device underruns
+    READ_ERRORS = (b"underrun", b"Will reconnect", b"Error in the pull function", b"Connection timed out",
+                   b"Stream ends prematurely")
+
+    def __init__(self, url, on_update, on_event=None, bitrate=None):
+        super().__init__(url, on_update, on_event, bitrate)
+        # In demux mode ffplay reads the audio we pipe in instead of opening the URL
+        demux = config.PLAYER_MODE == "demux"
+        cmd = ["ffplay", "-nodisp", "-hide_banner", "-nostats", "-autoexit", "-loglevel", "info",
+               "-i", "pipe:0" if demux else url]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE if demux else None, stdout=subprocess.DEVNULL,
+                                        stderr=subprocess.PIPE, bufsize=0)
+        self._log_tail = b""
+        self.timeshift = None
+        self._feeder = None
+
+        if demux:
+            sink = self.process.stdin
+            if config.TIMESHIFT_ENABLED:
+                # The connection fills the ring buffer; a feeder thread plays from it, so pausing
+                # the feeder never stops the socket from being read
+                sink = self.timeshift = TimeshiftBuffer(capacity_for(self.bitrate))
+                self._feeder = threading.Thread(target=self._feed, name="fmcli-timeshift-feed", daemon=True)
+                self._feeder.start()
+            self.source = IcyDemuxer(url, sink, on_title=lambda title: on_update({"current_title": title}),
+                                     on_headers=on_update)
+        else:
+            # ffplay has its own connection; keep one more open just for titles
+            self.source = MetadataWatcher(url, on_update=on_update)
+        self.source.start()
+
+    def _feed(self):
+        try:
+            while True:
+                chunk = self.timeshift.read(AUDIO_CHUNK)
+                if not chunk:
+                    break
+                self.process.stdin.write(chunk)
+        except (ValueError, OSError):
+            pass  # ffplay went away
+        finally:
+            try:
+                self.process.stdin.close()  # lets ffplay -autoexit finish
+            except OSError:
+                pass
+
+    @property
+    def error(self):
+        return getattr(self.source, "error", None)  # the demuxer's connection error
+
+    def fileno(self):
+        return self.process.stderr.fileno() if self.process.stderr else None
+
+    def on_readable(self):
+        data = os.read(self.process.stderr.fileno(), 4096)
+        if not data:
+            return False
+        # ffplay logs the decoded stream ("Stream #0:0: Audio: mp3, ...") once the decoder is open
+        log = self._log_tail + data
+        if self.first_audio_at is None and b"Audio:" in log:
+            self._first_audio()
+        errors = sum(log.count(marker) - self._log_tail.count(marker) for marker in self.READ_ERRORS)
+        if errors:
+            self._read_error(errors)
+        self._log_tail = data[-64:]
+        return True
+
+    def poll(self):
+        return self.process.poll()
+
+    def wait(self):
+        if self.process.stderr is not None:
+            while self.on_readable():
+                pass
+        return self.process.wait()
+
+    def pause(self):
+        if self.timeshift is not None:
+            self.timeshift.pause()
+        self.process.send_signal(signal.SIGSTOP)
+
+    def resume(self):
+        self.process.send_signal(signal.SIGCONT)
+        if self.timeshift is not None:
+            self.timeshift.resume()
+
+    def behind_live(self):
+        if self.timeshift is None:
+            return None
+        return self.timeshift.behind() * 8 / (self.bitrate * 1000)
+
+    def last_progress(self):
+        # Only the demuxer sees the bytes; in direct mode ffplay's log is all there is
+        if not isinstance(self.source, IcyDemuxer):
+            return None
+        return self.source.last_data_at or self._created
+
+    def bytes_received(self):
+        return self.source.bytes_received if isinstance(self.source, IcyDemuxer) else None
+
+    def go_live(self):
+        if self.timeshift is None:
+            return False
+        self.timeshift.seek_live()
+        return True
+
+    @property
+    def recorder(self):
+        return getattr(self.source, "recorder", None)
+
+    def start_recording(self, name, directory=None):
+        # Only the demuxer sees the audio; in direct mode ffplay has the only copy
+        if not isinstance(self.source, IcyDemuxer):
+            return False
+        if self.recorder is None:
+            self.source.set_recorder(Recorder(name, self.url, directory))
+        return True
+
+    def stop_recording(self):
+        if not isinstance(self.source, IcyDemuxer):
+            return None
+        recorder = self.source.set_recorder(None)
+        if recorder is None:
+            return None
+        recorder.close()
+        return recorder.stats()
+
+    def stop(self):
+        if self.stop_seconds is not None:
+            return
+        start = time.perf_counter()
+        self.stop_recording()
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGCONT)  # a stopped process would not act on SIGTERM
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.source.stop()
+        if self.timeshift is not None:
+            self.timeshift.abort()
+            self._feeder.join(timeout=2)
+            if not self._feeder.is_alive():
+                self.timeshift.release()
+        self.stop_seconds = time.perf_counter() - start
+
+
+class FfplayBackend:
+    name = "ffplay"
+
+    def __init__(self):
+        self.current = None
+
+    def play(self, url, on_update, on_event=None, bitrate=None):
+        switching = self.current is not None and self.current.poll() is None
+        started = time.perf_counter()
+        if switching:
+            with tracing.span("play.stop_previous", backend=self.name):
+                self.current.stop()
+        with tracing.span("play.spawn", backend=self.name):
+            self.current = FfplayPlayback(url, on_update, on_event, bitrate)
+        self.current.started_at = started
+        self.current.switching = switching
+        return self.current
+
+    def close(self):
+        if self.current is not None:
+            self.current.stop()
+            self.current = None
+
+
+class VlcPlayback(Playback):
+    """A stream on the backend's long-lived libVLC media player."""
+
+    backend = "vlc"
+
+    def __init__(self, backend, url, on_update, on_event=None, bitrate=None):
+        super().__init__(url, on_update, on_event, bitrate)
+        self._vlc = backend.vlc
+        self._player = backend.player
+        self._ended = threading.Event()
+        self._code = None
+        self._time_at = None
+
+        # Media events belong to this stream only, so late events of the previous one cannot end it
+        self.media = backend.instance.media_new(url)
+        events = self.media.event_manager()
+        events.event_attach(self._vlc.EventType.MediaMetaChanged, self._on_meta)
+        events.event_attach(self._vlc.EventType.MediaStateChanged, self._on_state)
+        self._player.set_media(self.media)
+        self._player.play()
+
+    def _on_meta(self, event):
+        meta = self._vlc.Meta
+        fields = {"stream_name": self.media.get_meta(meta.Title),
+                  "stream_genre": self.media.get_meta(meta.Genre),
+                  "current_title": self.media.get_meta(meta.NowPlaying)}
+        fields = {k: v for k, v in fields.items() if v and v != self.url}
+        if fields:
+            self.on_update(fields)
+
+    def _on_state(self, event):
+        state = self._vlc.State(event.u.new_state)
+        if state == self._vlc.State.Ended:
+            self._end(0)
+        elif state == self._vlc.State.Error:
+            self._end(1, "libVLC could not play the stream")
+
+    def _on_time(self, event):
+        if event.u.new_time > 0:
+            self._time_at = time.monotonic()
+            self._first_audio()
+
+    def last_progress(self):
+        # The play position only advances while libVLC gets audio
+        return self._time_at or self._created
+
+    def bytes_received(self):
+        stats = self._vlc.MediaStats()
+        return stats.read_bytes if self.media.get_stats(stats) else None
+
+    def _end(self, code, error=None):
+        if not self._ended.is_set():
+            self._code = code
+            self._error = error
+            self._ended.set()
+            self.on_event()
+
+    def poll(self):
+        return self._code if self._ended.is_set() else None
+
+    def wait(self):
+        self._ended.wait()
+        return self._code
+
+    def pause(self):
+        self._player.set_pause(1)
+
+    def resume(self):
+        self._player.set_pause(0)
+
+    def stop(self):
+        if self.stop_seconds is not None:
+            return
+        start = time.perf_counter()
+        self._end(0)
+        self._player.stop()
+        self.media.release()
+        self.stop_seconds = time.perf_counter() - start
+
+
+class VlcBackend:
+    """
+    In-process libVLC player. One instance and one media player live for the
+    whole session; switching stations only swaps the media.
+    """
+
+    name = "vlc"
+
+    def __init__(self):
+        import vlc  # optional: needs the libvlc shared library at runtime
+
+        self.vlc = vlc
+        try:
+            self.instance = vlc.Instance("--no-video", "--quiet")
+        except (NameError, AttributeError, OSError) as e:
+            raise RuntimeError(f"libVLC is not available: {e}") from e
+        if self.instance is None:
+            raise RuntimeError("libVLC could not be initialised")
+        self.player = self.instance.media_player_new()
+        self.current = None
+
+        self.player.event_manager().event_attach(vlc.EventType.MediaPlayerTimeChanged, self._on_time)
+
+    def _on_time(self, event):
+        current = self.current
+        if current is not None:
+            current._on_time(event)
+
+    def play(self, url, on_update, on_event=None, bitrate=None):
+        switching = self.current is not None and self.current.poll() is None
+        started = time.perf_counter()
+        if switching:
+            with tracing.span("play.stop_previous", backend=self.name):
+                self.current.stop()
+        self.current = None  # events for the old media must not reach the new playback
+        with tracing.span("play.spawn", backend=self.name):
+            playback = VlcPlayback(self, url, on_update, on_event, bitrate)
+        playback.started_at = started
+        playback.switching = switching
+        self.current = playback
+        return playback
+
+    def close(self):
+        if self.current is not None:
+            self.current.stop()
+            self.current = None
+        self.player.release()
+        self.instance.release()
+
+
+BACKENDS = {"ffplay": FfplayBackend, "vlc": VlcBackend}
+_backends = {}
+
+
+def get_backend(name=None, on_warning=None):
+    """
+    The shared backend called `name` (default FMCLI_PLAYER_BACKEND), created on
+    first use. Falls back to ffplay if libVLC cannot load, passing the warning
+    to `on_warning` (default: print it on the console).
+    """
+    name = name or config.PLAYER_BACKEND
+    if name not in _backends:
+        try:
+            _backends[name] = BACKENDS.get(name, FfplayBackend)()
+        except (ImportError, RuntimeError) as e:
+            message = f"{name} backend unavailable ({e}); using ffplay"
+            if on_warning is None:
+                console.print(f"[yellow]⚠️ {message}.[/]")
+            else:
+                on_warning(message)
+            _backends[name] = get_backend("ffplay")
+    return _backends[name]
+
+
+def close_backends():
+    for backend in set(_backends.values()):
+        backend.close()
+    _backends.clear()
@@ -0,0 +1,118 @@
+import asyncio
+import concurrent.futures
+import threading
+import config
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium shared by every page render.
+
+    The browser is started lazily on the first render and keeps `size` warm
+    tabs open, so only the first search pays for Chromium startup. All browser
+    work runs on a private event loop thread, which makes render() safe to call
+    from any thread.
+    """
+
+    def __init__(self, size=config.BROWSER_PAGES):
+        self.size = size
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._browser = None
+        self._pages = None
+        self._missing = 0  # tabs closed after a failure that could not be reopened yet
+
+    @property
+    def started(self):
+        return self._browser is not None
+
+    def _run(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # a hung render must give its tab back, not keep it checked out
+            raise
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="fmcli-browser", daemon=True)
+                self._thread.start()
+            if self._browser is None:
+                self._run(self._launch())
+
+    async def _launch(self):
+        import pyppeteer  # heavy, only needed once something is rendered
+
+        # Signal handlers can only be installed from the main thread.
+        self._browser = await pyppeteer.launch(
+            headless=True,
+            args=["--no-sandbox"],
+            handleSIGINT=False,
+            handleSIGTERM=False,
+            handleSIGHUP=False,
+        )
+        self._pages = asyncio.Queue()
+        self._missing = 0
+        for _ in range(self.size):
+            self._pages.put_nowait(await self._browser.newPage())
+
+    async def _take_page(self):
+        """A warm tab, or a new one in place of a tab that could not be replaced after a failure."""
+        if self._pages.empty() and self._missing:
+            self._missing -= 1
+            try:
+                return await self._browser.newPage()
+            except Exception:
+                self._missing += 1
+                raise
+        return await self._pages.get()
+
+    async def _render(self, url, timeout):
+        page = await self._take_page()
+        try:
+            await page.goto(url, {"timeout": int(timeout * 1000)})
+            html = await page.content()
+        except BaseException:  # including the CancelledError of a render that render() gave up on
+            # A tab that timed out mid-navigation is not safe to reuse; only a working
+            # replacement goes back into the pool.
+            try:
+                await page.close()
+            except Exception:
+                pass
+            try:
+                self._pages.put_nowait(await self._browser.newPage())
+            except Exception:
+                self._missing += 1  # opened again on a later render
+            raise
+        self._pages.put_nowait(page)
+        return html
+
+    def render(self, url: str, timeout=config.RENDER_TIMEOUT) -> str:
+        """Load url in a warm tab and return the JavaScript-rendered HTML."""
+        self._ensure_started()
+        return self._run(self._render(url, timeout), timeout + 5)
+
+    def shutdown(self):
+        """Close the browser and stop the loop thread. Safe to call more than once."""
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._browser is not None:
+                try:
+                    self._run(self._browser.close(), 10)
+                except Exception:
+                    pass
+                self._browser = None
+                self._pages = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+            self._loop = None
+            self._thread = None
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,100 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from appdirs import user_cache_dir
+import config
+
+
+def _key(query: str, start_index) -> str:
+    return f"{query.strip().lower()}\x00{int(start_index or 0)}"
+
+
+class SearchCache:
+    """
+    Persistent cache of parsed search pages keyed by (query, page offset).
+
+    Entries older than `ttl` are stale: get() still returns them, flagged as
+    not fresh, so the caller can serve them while revalidating in the
+    background. The table is trimmed to `max_entries` by least recent access.
+    """
+
+    def __init__(self, path=None, ttl=config.CACHE_TTL, max_entries=config.CACHE_MAX_ENTRIES):
+        self.path = path or os.path.join(user_cache_dir("fmcli"), "search_cache.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " key TEXT PRIMARY KEY, stored REAL NOT NULL, accessed REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages(accessed)")
+        return self._db
+
+    def get(self, query: str, start_index=0):
+        """Return ((stations, prev_link, next_link), fresh) or None on a miss."""
+        key = _key(query, start_index)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT stored, payload FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE pages SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            stored, payload = row
+            fresh = now - stored < self.ttl
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+
+        data = json.loads(payload)
+        return (data["stations"], data["prev_link"], data["next_link"]), fresh
+
+    def put(self, query: str, start_index, stations, prev_link, next_link):
+        payload = json.dumps({"stations": stations, "prev_link": prev_link, "next_link": next_link})
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO pages (key, stored, accessed, payload) VALUES (?, ?, ?, ?)",
+                (_key(query, start_index), now, now, payload),
+            )
+            # Evict least recently used pages beyond the size bound.
+            db.execute(
+                "DELETE FROM pages WHERE key IN ("
+                " SELECT key FROM pages ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn().execute("DELETE FROM pages")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+search_cache = SearchCache()
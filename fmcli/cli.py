@@ -0,0 +1,314 @@
+import json
+import sys
+import threading
+import time
+
+import tracing
+
+# Non-interactive subcommands. Output goes to stdout one record per line as
+# soon as it is available: JSON lines with --json, tab-separated text without.
+# Nothing here clears the console or draws Rich widgets.
+
+# Exit codes besides 0 (success) and 130 (interrupted)
+EXIT_NOT_FOUND = 1
+EXIT_STREAM_FAILED = 1  # a stream could not be played or recorded
+EXIT_FETCH_FAILED = 3  # fmstream.org could not be reached (2 is argparse's usage error)
+EXIT_PLAYER_UNAVAILABLE = 4  # the player program could not be started
+
+
+def _emit(record, as_json):
+    if as_json:
+        line = json.dumps(record, ensure_ascii=False)
+    else:
+        line = "\t".join(str(v) for k, v in record.items() if k != "type" and not isinstance(v, (list, dict)))
+    print(line, flush=True)
+
+
+def _error(message, as_json, reason):
+    if as_json:
+        print(json.dumps({"type": "error", "reason": reason, "error": message}), file=sys.stderr, flush=True)
+    else:
+        print(f"error: {message}", file=sys.stderr, flush=True)
+
+
+def _warning(message, as_json, reason):
+    if as_json:
+        print(json.dumps({"type": "warning", "reason": reason, "warning": message}), file=sys.stderr, flush=True)
+    else:
+        print(f"warning: {message}", file=sys.stderr, flush=True)
+
+
+def _station_record(station, page):
+    return {"type": "station", "page": page, "name": station["name"], "genre": station["genre"],
+            "location": station["location"], "description": station["description"],
+            "streams": station["streams"]}
+
+
+def _fetch_failed(errors, query, as_json):
+    """Report the page fetches that failed; any stations printed came from the local index."""
+    for error in errors:
+        _error(f"could not load results for {query!r}: {error}", as_json, reason="fetch_failed")
+
+
+def cmd_search(args):
+    found = 0
+    errors = []
+    if args.local:
+        from station_index import station_index
+
+        for station in station_index.search(args.query):
+            found += 1
+            _emit(_station_record(station, 1), args.json)
+    else:
+        from search import iter_search
+
+        start_index = 0
+        for page in range(1, args.pages + 1):
+            stations = iter_search(args.query, start_index, quiet=True, on_error=errors.append)
+            while True:
+                try:
+                    station = next(stations)
+                except StopIteration as done:
+                    _, next_link = done.value
+                    break
+                found += 1
+                _emit(_station_record(station, page), args.json)
+            if next_link is None:
+                break
+            start_index = next_link
+
+    _fetch_failed(errors, args.query, args.json)
+    if not found:
+        if errors:
+            return EXIT_FETCH_FAILED
+        _error(f"no stations found for {args.query!r}", args.json, reason="not_found")
+        return EXIT_NOT_FOUND
+    return 0
+
+
+def cmd_streams(args):
+    import search
+
+    errors = []
+    stations, _, _ = search.search_stations(args.query, quiet=True, on_error=errors.append)
+    _fetch_failed(errors, args.query, args.json)
+    if not 1 <= args.station <= len(stations):
+        if errors and not stations:
+            return EXIT_FETCH_FAILED
+        _error(f"no station #{args.station} for {args.query!r} ({len(stations)} found)", args.json, reason="not_found")
+        return EXIT_NOT_FOUND
+    station = stations[args.station - 1]
+
+    probes = {}
+    if args.probe:
+        from prober import probe_streams
+        probes = {r["url"]: r for r in probe_streams(station["streams"])}
+
+    for stream in station["streams"]:
+        record = {"type": "stream", "station": station["name"], "codec": stream["codec"],
+                  "bitrate": stream["bitrate"], "url": stream["url"]}
+        if args.probe:
+            probe = probes[stream["url"]]
+            record.update({k: probe[k] for k in ("ok", "error", "connect_ms", "ttfb_ms", "kbps",
+                                                 "icy_br", "content_type")})
+        _emit(record, args.json)
+    return 0
+
+
+def cmd_nowplaying(args):
+    if not args.follow:
+        from icy import fetch_icy_metadata
+
+        meta = fetch_icy_metadata(args.url)
+        if "error" in meta:
+            _error(meta["error"], args.json, reason="stream_failed")
+            return EXIT_STREAM_FAILED
+        _emit({"type": "nowplaying", "url": args.url, "stream_name": meta["stream_name"],
+               "current_title": meta["current_title"], "fields": meta.get("fields", {})}, args.json)
+        return 0
+
+    from icy import MetadataWatcher
+
+    def on_update(fields):
+        _emit(dict({"type": "metadata", "url": args.url}, **fields), args.json)
+
+    watcher = MetadataWatcher(args.url, on_update=on_update)
+    watcher.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return 0
+
+
+def cmd_play(args):
+    import config
+    from backends import get_backend
+    from prober import advertised_kbps
+    from supervisor import Supervisor, watch
+
+    def on_update(fields):
+        fields = {k: v for k, v in fields.items() if v and v != "N/A"}
+        if fields:
+            _emit(dict({"type": "metadata", "url": current["url"]}, **fields), args.json)
+
+    def on_event(event):
+        _emit(event, args.json)
+
+    current = {"url": args.url}
+    alternates = [{"url": url} for url in args.fallback]
+    controller = None
+    if (args.adaptive or config.ADAPTIVE_ENABLED) and alternates:
+        from adaptive import AdaptiveController
+        from prober import probe_streams
+
+        # The variants' bitrates come from their icy-br headers
+        for stream, probe in zip([current] + alternates, probe_streams([current] + alternates)):
+            if probe["icy_br"]:
+                stream["bitrate"] = f"{probe['icy_br']} kbps"
+        controller = AdaptiveController(alternates, current, on_event=on_event)
+
+    # Drops and stalls are reconnected (and reported) like in the player
+    supervisor = Supervisor(current, alternates, on_event=on_event)
+    backend = get_backend(args.backend,
+                          on_warning=lambda message: _warning(message, args.json, reason="backend_unavailable"))
+    code, playback, switch = None, None, None
+    failed = False
+
+    def check():
+        nonlocal switch
+        switch = controller.check(playback)
+        return switch is not None
+
+    try:
+        while True:
+            try:
+                playback = backend.play(current["url"], on_update, bitrate=advertised_kbps(current))
+            except OSError as e:  # ffplay is not installed
+                _error(f"cannot start {backend.name}: {e}", args.json, reason="player_unavailable")
+                return EXIT_PLAYER_UNAVAILABLE
+            if controller is not None:
+                controller.start(current)
+            reason = watch(playback, config.STALL_SECONDS if supervisor.attempts else 0,
+                           check=check if controller is not None else None)
+            ended = playback.poll()  # None if it stalled or was switched away from
+            playback.stop()
+            code = playback.poll()
+            if switch is not None:
+                current, switch = switch, None
+                supervisor.current = current
+                continue
+            plan = supervisor.next(playback, reason)
+            if plan is None:
+                # Retries ran out, or (with reconnects off) the stream ended: clean only with code 0
+                failed = bool(supervisor.attempts) or ended != 0 or bool(playback.error)
+                break
+            current, delay = plan
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        code = 0
+        if playback is not None:
+            supervisor.finish(playback)
+    finally:
+        if playback is not None:
+            playback.stop()
+    if playback is None:
+        return 130
+    record = dict({"type": "stopped", "url": playback.url, "backend": playback.backend, "exit_code": code},
+                  **playback.stats(), **supervisor.stats())
+    if controller is not None:
+        record.update(switches_down=controller.stats()["down"], switches_up=controller.stats()["up"])
+    _emit(record, args.json)
+    return EXIT_STREAM_FAILED if failed else 0
+
+
+def cmd_record(args):
+    from urllib.parse import urlsplit
+    from icy import IcyDemuxer
+    from recorder import Recorder
+
+    # One connection and one recorder per URL, nothing played: the demuxer's audio goes straight to disk
+    demuxers, recorders = [], {}
+    for url in args.url:
+        def on_headers(headers, url=url):
+            name = headers["stream_name"] if headers["stream_name"] != "N/A" else urlsplit(url).hostname
+            recorders[url] = Recorder(name or url, url, args.dir)
+            next(d for d in demuxers if d.url == url).set_recorder(recorders[url])
+
+        def on_title(title, url=url):
+            _emit({"type": "track", "url": url, "title": title}, args.json)
+
+        demuxers.append(IcyDemuxer(url, None, on_title=on_title, on_headers=on_headers))
+    for demuxer in demuxers:
+        demuxer.start()
+
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while any(d.is_alive() for d in demuxers):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+
+    failed = 0
+    for demuxer in demuxers:
+        demuxer.stop()  # detaches and closes its recorder
+        recorder = recorders.get(demuxer.url)
+        if recorder is None:
+            failed += 1
+            _error(f"{demuxer.url}: {demuxer.error or 'no audio received'}", args.json, reason="stream_failed")
+            continue
+        recorder.close()
+        _emit(dict({"type": "recorded", "url": demuxer.url}, **recorder.stats()), args.json)
+    return EXIT_STREAM_FAILED if failed else 0
+
+
+def add_subcommands(parser):
+    sub = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    p = sub.add_parser("search", help="search stations, one record per station")
+    p.add_argument("query")
+    p.add_argument("--pages", type=int, default=1, help="result pages to follow (default 1)")
+    p.add_argument("--local", action="store_true", help="search the local station index only")
+    p.set_defaults(handler=cmd_search)
+
+    p = sub.add_parser("streams", help="list the streams of one search result")
+    p.add_argument("query")
+    p.add_argument("--station", type=int, default=1, help="result number (default 1)")
+    p.add_argument("--probe", action="store_true", help="measure each stream")
+    p.set_defaults(handler=cmd_streams)
+
+    p = sub.add_parser("nowplaying", help="print ICY metadata of a stream URL")
+    p.add_argument("url")
+    p.add_argument("--follow", action="store_true", help="keep printing title changes")
+    p.set_defaults(handler=cmd_nowplaying)
+
+    p = sub.add_parser("play", help="play a stream URL headless, printing title changes")
+    p.add_argument("url")
+    p.add_argument("--backend", choices=("ffplay", "vlc"), help="audio backend (default FMCLI_PLAYER_BACKEND)")
+    p.add_argument("--fallback", action="append", default=[], metavar="URL",
+                   help="another stream of the station to try when URL keeps failing (repeatable)")
+    p.add_argument("--adaptive", action="store_true",
+                   help="switch between URL and the fallbacks by bitrate as throughput allows")
+    p.set_defaults(handler=cmd_play)
+
+    p = sub.add_parser("record", help="record stream URLs to disk, one file per title")
+    p.add_argument("url", nargs="+")
+    p.add_argument("--dir", help="where to create session directories (default FMCLI_RECORD_DIR)")
+    p.add_argument("--duration", type=float, help="stop after this many seconds (default: until Ctrl+C)")
+    p.set_defaults(handler=cmd_record)
+
+    for p in sub.choices.values():
+        p.add_argument("--json", action="store_true", help="JSON lines output")
+
+
+def run(args):
+    """Run the chosen subcommand and return its exit code."""
+    try:
+        with tracing.span(f"cli.{args.command}"):
+            return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
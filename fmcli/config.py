@@ -0,0 +1,114 @@
+import os
+
+# Runtime settings. Every value can be overridden with an FMCLI_* environment variable.
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default).strip().lower()
+
+
+# --- Search / rendering ---
+BROWSER_PAGES = max(1, _env_int("FMCLI_BROWSER_PAGES", 2))  # warm tabs kept open in the pool
+RENDER_TIMEOUT = _env_float("FMCLI_RENDER_TIMEOUT", 20)
+SEARCH_MODE = _env_str("FMCLI_SEARCH_MODE", "auto")  # auto | static | render
+STATIC_TIMEOUT = _env_float("FMCLI_STATIC_TIMEOUT", 10)
+
+# --- Search result cache ---
+CACHE_ENABLED = _env_bool("FMCLI_CACHE", True)
+CACHE_TTL = _env_float("FMCLI_CACHE_TTL", 6 * 3600)  # seconds before an entry is stale
+CACHE_MAX_ENTRIES = max(1, _env_int("FMCLI_CACHE_MAX_ENTRIES", 500))
+CACHE_STALE_WHILE_REVALIDATE = _env_bool("FMCLI_CACHE_SWR", True)
+
+# --- Pagination prefetch ---
+PREFETCH_ENABLED = _env_bool("FMCLI_PREFETCH", True)
+PREFETCH_MAX_IN_FLIGHT = max(1, _env_int("FMCLI_PREFETCH_MAX_IN_FLIGHT", 2))
+
+# --- Local station index ---
+INDEX_ENABLED = _env_bool("FMCLI_INDEX", True)
+INDEX_REFRESH_AGE = _env_float("FMCLI_INDEX_REFRESH_AGE", 24 * 3600)  # re-fetch queries older than this
+INDEX_REFRESH_BATCH = max(0, _env_int("FMCLI_INDEX_REFRESH_BATCH", 5))
+
+# --- Favorites ---
+FAVORITES_MAX_AGE = _env_float("FMCLI_FAVORITES_MAX_AGE", 7 * 24 * 3600)  # re-resolve stored streams older than this
+
+# --- History ---
+HISTORY_MAX_ENTRIES = max(1, _env_int("FMCLI_HISTORY_MAX_ENTRIES", 10000))  # listens kept; older ones drop off
+HISTORY_FSYNC_EVERY = max(1, _env_int("FMCLI_HISTORY_FSYNC_EVERY", 20))  # appended entries per fsync
+HISTORY_FSYNC_INTERVAL = _env_float("FMCLI_HISTORY_FSYNC_INTERVAL", 5)  # ...or seconds since the last one
+
+# --- Playback ---
+# ffplay: one ffplay process per stream; vlc: in-process libVLC player reused across stations
+PLAYER_BACKEND = _env_str("FMCLI_PLAYER_BACKEND", "ffplay")
+# ffplay backend only:
+# demux: one connection read by Python, audio piped to ffplay, metadata parsed inline
+# direct: ffplay opens the URL itself and metadata is polled over a second connection
+PLAYER_MODE = _env_str("FMCLI_PLAYER_MODE", "demux")
+METADATA_BACKOFF_MAX = _env_float("FMCLI_METADATA_BACKOFF_MAX", 60)  # seconds between metadata reconnects
+PLAYER_TICK = max(0.0, _env_float("FMCLI_PLAYER_TICK", 1.0))  # seconds per animation frame; 0 = no animation
+
+# --- Timeshift (ffplay demux mode) ---
+TIMESHIFT_ENABLED = _env_bool("FMCLI_TIMESHIFT", True)  # keep reading while paused; resume where you left off
+TIMESHIFT_MINUTES = _env_float("FMCLI_TIMESHIFT_MINUTES", 30)  # buffer size, in minutes at the stream bitrate
+
+# --- Reconnect ---
+STALL_SECONDS = max(0.0, _env_float("FMCLI_STALL_SECONDS", 8))  # no audio for this long = stalled; 0 = off
+STALL_UNDERRUNS = max(1, _env_int("FMCLI_STALL_UNDERRUNS", 3))  # ffplay read errors within STALL_SECONDS
+RECONNECT_ATTEMPTS = max(0, _env_int("FMCLI_RECONNECT_ATTEMPTS", 20))  # in a row before giving up; 0 = off
+RECONNECT_BASE = _env_float("FMCLI_RECONNECT_BASE", 1)  # first delay; doubles per attempt, with jitter
+RECONNECT_MAX = _env_float("FMCLI_RECONNECT_MAX", 60)  # longest delay between attempts
+RECONNECT_RESET = _env_float("FMCLI_RECONNECT_RESET", 30)  # seconds of playback that reset the backoff
+
+# --- Adaptive bitrate ---
+# Switch between a station's bitrate variants as the link allows (FMCLI_ADAPTIVE=1 or `play --adaptive`)
+ADAPTIVE_ENABLED = _env_bool("FMCLI_ADAPTIVE", False)
+ADAPTIVE_DOWN_RATIO = _env_float("FMCLI_ADAPTIVE_DOWN_RATIO", 0.9)  # throughput/bitrate below which to step down...
+ADAPTIVE_DOWN_SECONDS = _env_float("FMCLI_ADAPTIVE_DOWN_SECONDS", 6)  # ...sustained this long
+ADAPTIVE_UP_AFTER = _env_float("FMCLI_ADAPTIVE_UP_AFTER", 60)  # seconds on a variant before trying the next one up
+ADAPTIVE_UP_RATIO = _env_float("FMCLI_ADAPTIVE_UP_RATIO", 0.95)  # a probe of the next variant must reach its bitrate * this
+ADAPTIVE_UP_MAX_WAIT = _env_float("FMCLI_ADAPTIVE_UP_MAX_WAIT", 600)  # cap on the wait after failed step-up probes
+
+# --- Recording ---
+RECORD_DIR = os.environ.get("FMCLI_RECORD_DIR", "").strip()  # default: <user data dir>/recordings
+RECORD_WRITE_KB = max(4, _env_int("FMCLI_RECORD_WRITE_KB", 256))  # size of each disk write
+RECORD_BUFFER_MB = max(1, _env_int("FMCLI_RECORD_BUFFER_MB", 16))  # audio allowed to wait for the disk
+
+# --- Stream probing ---
+PROBE_WINDOW = _env_float("FMCLI_PROBE_WINDOW", 3)  # seconds of audio used to measure throughput
+PROBE_TIMEOUT = _env_float("FMCLI_PROBE_TIMEOUT", 5)  # connect + first byte budget per stream
+PROBE_CONCURRENCY = max(1, _env_int("FMCLI_PROBE_CONCURRENCY", 8))
+PROBE_MIN_BITRATE = _env_int("FMCLI_PROBE_MIN_BITRATE", 64)  # kbps floor for auto-pick
+
+# --- HTTP transport ---
+HTTP_POOL_HOSTS = max(1, _env_int("FMCLI_HTTP_POOL_HOSTS", 10))  # hosts with a kept-alive pool
+HTTP_POOL_SIZE = max(1, _env_int("FMCLI_HTTP_POOL_SIZE", 10))  # connections kept per host
+HTTP_CONNECT_TIMEOUT = _env_float("FMCLI_HTTP_CONNECT_TIMEOUT", 5)
+HTTP_READ_TIMEOUT = _env_float("FMCLI_HTTP_READ_TIMEOUT", 10)
+HTTP_RETRIES = max(0, _env_int("FMCLI_HTTP_RETRIES", 3))  # connect errors and 429/5xx responses
+HTTP_BACKOFF = _env_float("FMCLI_HTTP_BACKOFF", 0.5)  # retry delays: backoff * 2 ** (attempt - 1)
+
+# --- Profiling ---
+# Span timings of search, parsing, rendering and playback startup (also `--profile` / `--trace FILE`)
+PROFILE = _env_bool("FMCLI_PROFILE", False)  # print per-phase percentiles at exit
+TRACE_FILE = os.environ.get("FMCLI_TRACE_FILE", "").strip()  # also write Chrome trace-event JSON here
+TRACE_MAX_SPANS = max(1000, _env_int("FMCLI_TRACE_MAX_SPANS", 200_000))  # later spans are counted, not kept
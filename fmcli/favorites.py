@@ -1,46 +1,248 @@
 # favorites.py
 import json
 import os
+import threading
+import time
+from appdirs import user_data_dir
 from console_manager import console
 from rich.table import Table
+import config
 
-FAV_FILE = "favorites.json"
+LEGACY_FAV_FILE = "favorites.json"  # pre-SQLite location, relative to the working directory
+LEGACY_IMPORTED = 1  # PRAGMA user_version once favorites.json has been looked at
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    genre TEXT NOT NULL DEFAULT 'N/A',
+    description TEXT NOT NULL DEFAULT '',
+    streams TEXT NOT NULL DEFAULT '[]',
+    verified_at REAL NOT NULL DEFAULT 0,
+    UNIQUE (name, location)
+);
+"""
+
+
+def _stored_streams(streams):
+    return [{"codec": s.get("codec", "N/A"), "bitrate": s.get("bitrate", "N/A"), "url": s["url"]} for s in streams]
+
+
+def _key(station):
+    return station["name"], station.get("location", "N/A")
+
+
+class FavoritesStore:
+    """
+    Favorites in SQLite under the per-user data directory, mirrored in memory.
+
+    The list and a (name, location) index are loaded once; every change is a
+    single-row transaction, so a crash never leaves a half-written file and two
+    terminals can write at once. The mirror is reloaded only when SQLite's
+    data_version shows another connection committed since the last read.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir("fmcli"), "favorites.sqlite3")
+        self._lock = threading.RLock()
+        self._db = None
+        self._version = None
+        self._items = []
+        self._index = {}
+
+    def _conn(self):
+        if self._db is None:
+            import sqlite3  # kept off the startup path; see main.py
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")  # WAL keeps commits atomic without an fsync each
+            self._db.executescript(SCHEMA)
+            self._import_legacy()
+        return self._db
+
+    def _import_legacy(self):
+        """
+        One-time import of a favorites.json left in the working directory.
+        PRAGMA user_version records that it ran, so favorites removed later
+        never come back from the old file.
+        """
+        if self._db.execute("PRAGMA user_version").fetchone()[0] >= LEGACY_IMPORTED:
+            return
+        legacy = []
+        # A store that already has rows predates this marker and was imported into (or started fresh) then
+        if os.path.exists(LEGACY_FAV_FILE) and not self._db.execute("SELECT 1 FROM favorites LIMIT 1").fetchone():
+            try:
+                with open(LEGACY_FAV_FILE, "r") as f:
+                    legacy = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                pass
+        with self._db:
+            for station in legacy:
+                self._insert(station)
+            self._db.execute(f"PRAGMA user_version = {LEGACY_IMPORTED}")
+
+    def _insert(self, station):
+        self._db.execute(
+            "INSERT OR IGNORE INTO favorites (name, location, genre, description, streams, verified_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (station["name"], station.get("location", "N/A"), station.get("genre", "N/A"),
+             station.get("description", ""), json.dumps(station.get("streams", [])),
+             station.get("verified_at", 0)),
+        )
+
+    def _sync(self):
+        """Reload the in-memory mirror if the database changed under us."""
+        db = self._conn()
+        version = db.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        items = []
+        for name, location, genre, description, streams, verified_at in db.execute(
+                "SELECT name, location, genre, description, streams, verified_at FROM favorites ORDER BY id"):
+            items.append({"name": name, "location": location, "genre": genre, "description": description,
+                          "streams": json.loads(streams), "verified_at": verified_at})
+        self._items = items
+        self._index = {_key(f): f for f in items}
+        self._version = version
+
+    def all(self):
+        with self._lock:
+            self._sync()
+            return list(self._items)
+
+    def add(self, station):
+        """Add a station; returns False if one with the same name and location is already saved."""
+        favorite = {
+            "name": station["name"],
+            "location": station.get("location", "N/A"),
+            "genre": station.get("genre", "N/A"),
+            "description": station.get("description", ""),
+            "streams": _stored_streams(station.get("streams", [])),
+            "verified_at": time.time(),
+        }
+        with self._lock:
+            self._sync()
+            if _key(favorite) in self._index:
+                return False
+            db = self._conn()
+            with db:
+                cur = db.execute(
+                    "INSERT OR IGNORE INTO favorites (name, location, genre, description, streams, verified_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (favorite["name"], favorite["location"], favorite["genre"], favorite["description"],
+                     json.dumps(favorite["streams"]), favorite["verified_at"]),
+                )
+            if not cur.rowcount:
+                self._version = None  # another terminal added it first
+                return False
+            # Our own commits do not bump data_version, so mirror them by hand
+            self._items.append(favorite)
+            self._index[_key(favorite)] = favorite
+            return True
+
+    def update_streams(self, station, streams):
+        """Store freshly resolved streams and mark them verified now. Returns the favorite or None."""
+        stored = _stored_streams(streams)
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            with db:
+                cur = db.execute("UPDATE favorites SET streams = ?, verified_at = ? WHERE name = ? AND location = ?",
+                                 (json.dumps(stored), now, *_key(station)))
+            if not cur.rowcount:
+                return None
+            self._sync()
+            favorite = self._index.get(_key(station))
+            if favorite is not None:
+                favorite["streams"] = stored
+                favorite["verified_at"] = now
+            return favorite
+
+    def remove(self, station):
+        with self._lock:
+            db = self._conn()
+            with db:
+                cur = db.execute("DELETE FROM favorites WHERE name = ? AND location = ?", _key(station))
+            self._sync()
+            favorite = self._index.pop(_key(station), None)
+            if favorite is not None:
+                self._items.remove(favorite)
+            return cur.rowcount > 0
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+                self._version = None
+
+
+favorites_store = FavoritesStore()
 
 # ------------------ Helper Functions ------------------
 def load_favorites():
-    if not os.path.exists(FAV_FILE):
-        return []
-    with open(FAV_FILE, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []
-
-def save_favorites(favorites):
-    with open(FAV_FILE, "w") as f:
-        json.dump(favorites, f, indent=2)
+    return favorites_store.all()
 
 # ------------------ Favorite Operations ------------------
 def add_favorite(station):
-    favorites = load_favorites()
-    # Avoid duplicates (match name + location)
-    if any(f["name"] == station["name"] and f.get("location") == station.get("location") for f in favorites):
+    # Duplicates are matched on name + location
+    if not favorites_store.add(station):
         console.print("[yellow]⭐ Station already in favorites.[/]")
         return
-    favorites.append({
-        "name": station["name"],
-        "location": station.get("location", "N/A"),
-        "genre": station.get("genre", "N/A"),
-        "description": station.get("description", "")
-    })
-    save_favorites(favorites)
     console.print("[green]✅ Station added to favorites.[/]")
 
+def update_favorite_streams(favorite, streams):
+    """Store freshly resolved streams for a favorite and mark them verified now."""
+    return favorites_store.update_streams(favorite, streams)
+
+def is_stale(favorite):
+    """True when the stored streams are missing or older than FMCLI_FAVORITES_MAX_AGE."""
+    if not favorite.get("streams"):
+        return True
+    return time.time() - favorite.get("verified_at", 0) > config.FAVORITES_MAX_AGE
+
+def resolve_favorite(favorite, quiet=True):
+    """
+    Look the favorite up on fmstream again and store its current streams.
+    Returns the updated favorite, or None if the station was not found.
+    """
+    from search import search_stations
+
+    results, _, _ = search_stations(favorite["name"], quiet=quiet, fallback=not quiet)
+    match = next((r for r in results if _key(r) == _key(favorite)), None)
+    if match is None:
+        match = next((r for r in results if r["name"] == favorite["name"]), None)
+    if match is None or not match["streams"]:
+        return None
+    return update_favorite_streams(favorite, match["streams"])
+
+_revalidating = set()
+
+def revalidate_in_background(favorite):
+    """Refresh a favorite's streams on a daemon thread; at most one refresh per station at a time."""
+    key = _key(favorite)
+    if key in _revalidating:
+        return
+    _revalidating.add(key)
+
+    def run():
+        try:
+            resolve_favorite(favorite)
+        except Exception:
+            pass  # keep the stored streams; the next failure or stale check retries
+        finally:
+            _revalidating.discard(key)
+
+    threading.Thread(target=run, name="fmcli-fav-revalidate", daemon=True).start()
+
 def remove_favorite(index):
     favorites = load_favorites()
     if 0 <= index < len(favorites):
-        removed = favorites.pop(index)
-        save_favorites(favorites)
+        removed = favorites[index]
+        favorites_store.remove(removed)
         console.print(f"[red]❌ Removed {removed['name']} from favorites.[/]")
     else:
         console.print("[red]❌ Invalid favorite index.[/]")
@@ -56,9 +258,11 @@ def show_favorites():
     table.add_column("Station", style="bold cyan")
     table.add_column("Location", style="green")
     table.add_column("Genre", style="magenta")
+    table.add_column("Streams", justify="right", style="dim")
 
     for i, station in enumerate(favorites, 1):
-        table.add_row(str(i), station["name"], station.get("location", "N/A"), station.get("genre", "N/A"))
+        streams = str(len(station["streams"])) if station.get("streams") else "—"
+        table.add_row(str(i), station["name"], station.get("location", "N/A"), station.get("genre", "N/A"), streams)
 
     console.print(table)
     return favorites
@@ -1,18 +1,17 @@
-import re
 import sys
 import time
 import threading
 import subprocess
 import itertools
 import os
-import requests
-from requests_html import HTMLSession
-from bs4 import BeautifulSoup
 from rich.console import Console
 from rich.table import Table
 from rich.prompt import Prompt
 from rich.panel import Panel
 from rich.live import Live
+from browser import browser_pool
+from station_parser import parse_results
+from icy import fetch_icy_metadata as read_icy_metadata
 
 console = Console()
 BASE_URL = "https://fmstream.org/index.php?s="
@@ -24,60 +23,14 @@ def clear_console():
 
 def search_stations(query: str, start_index=0):
     """Search stations and return stations list and pagination links."""
-    session = HTMLSession()
     try:
         url = f"{BASE_URL}{query}&n={start_index}"
-        resp = session.get(url)
-        resp.html.render(timeout=20)
+        html = browser_pool.render(url)
     except Exception as e:
         console.print(f"[red]❌ Failed to render page:[/] {e}")
         return [], None, None
 
-    soup = BeautifulSoup(resp.html.html, "html.parser")
-    stations = []
-
-    for block in soup.select("div.stnblock"):
-        name = block.select_one("h3.stn")
-        name = name.text.strip() if name else "Unknown Station"
-        location = block.select_one(".loc")
-        location = location.text.strip() if location else "Unknown Location"
-        genre = block.select_one(".sty")
-        genre = genre.text.strip() if genre else "Unknown Genre"
-        desc = block.select_one(".desc")
-        desc = desc.text.strip() if desc else ""
-
-        streams = []
-        for sq in block.select(".sqdiv .sq"):
-            url = sq.get("title")
-            codec_div = sq.select_one(".cn")
-            bitrate_div = sq.select_one(".br")
-            codec = codec_div.text.strip() if codec_div else "Unknown"
-            bitrate = bitrate_div.text.strip() + " kbps" if bitrate_div else "Unknown"
-            if url:
-                streams.append({"url": url, "codec": codec, "bitrate": bitrate})
-
-        if streams:
-            stations.append({
-                "name": name,
-                "location": location,
-                "genre": genre,
-                "description": desc,
-                "streams": streams
-            })
-
-    # Pagination links
-    footer = soup.select_one("footer#footer")
-    prev_link = None
-    next_link = None
-    if footer:
-        prev_tag = footer.select_one('a.btn.arrbtn:contains("←")')
-        next_tag = footer.select_one('a.btn.arrbtn:contains("→")')
-        if prev_tag and "n=" in prev_tag.get("href", ""):
-            prev_link = int(re.search(r"n=(\d+)", prev_tag["href"]).group(1))
-        if next_tag and "n=" in next_tag.get("href", ""):
-            next_link = int(re.search(r"n=(\d+)", next_tag["href"]).group(1))
-
-    return stations, prev_link, next_link
+    return parse_results(html)
 
 
 def show_station_list(stations):
@@ -117,45 +70,16 @@ def show_streams(station):
 
 
 
-def get_icy_title_from_metadata(metadata_bytes: bytes) -> str | None:
-    metadata_str = metadata_bytes.decode('latin-1', errors='ignore').strip('\x00')
-    match = re.search(r"StreamTitle='([^']*)';", metadata_str)
-    if match:
-        return match.group(1).strip()
-    return None
-
-
 def fetch_icy_metadata(url, metadata_dict, stopped_event):
     last_title = ""
-    headers = {"Icy-MetaData": "1", "User-Agent": "VLC/3.0"}
     while not stopped_event.is_set():
-        try:
-            r = requests.get(url, headers=headers, stream=True, timeout=10)
-            metaint = r.headers.get('icy-metaint')
-            if not metaint:
-                icy_name = r.headers.get("icy-name")
-                if icy_name and icy_name != last_title:
-                    metadata_dict["now_playing"] = f"Station: {icy_name}"
-                    last_title = icy_name
-                r.close()
-                time.sleep(5)
-                continue
-            metaint = int(metaint)
-            r.raw.read(metaint, decode_content=False)
-            size_byte = r.raw.read(1, decode_content=False)
-            if not size_byte:
-                r.close()
-                continue
-            metadata_length = int.from_bytes(size_byte, 'little') * 16
-            metadata_bytes = r.raw.read(metadata_length, decode_content=False)
-            r.close()
-            if metadata_bytes:
-                title = get_icy_title_from_metadata(metadata_bytes)
-                if title and title != last_title:
-                    metadata_dict["now_playing"] = title
-                    last_title = title
-        except:
-            pass
+        meta = read_icy_metadata(url)
+        title = meta.get("current_title")
+        if not title or title == "N/A":
+            title = f"Station: {meta['stream_name']}" if meta.get("stream_name", "N/A") != "N/A" else None
+        if title and title != last_title:
+            metadata_dict["now_playing"] = title
+            last_title = title
         time.sleep(5)
 
 
@@ -288,4 +212,7 @@ def main():
 
 if __name__ == "__main__":
     sys.stdout.reconfigure(line_buffering=True)
-    main()
+    try:
+        main()
+    finally:
+        browser_pool.shutdown()
@@ -1,90 +1,224 @@
-import struct
-import re
-import requests
+import json
+import os
+import threading
+import time
+from collections import deque
+from appdirs import user_data_dir
 from rich.table import Table
 from console_manager import console
-from utils import read_fully
 from utils import clear_console
+import config
+
+
+def _key(entry):
+    return entry["name"], entry["location"]
+
+
+class PlaybackHistory:
+    """
+    Playback history as an append-only JSON-lines log, one line per finished
+    listen, fsynced in batches.
+
+    Only the last `max_entries` listens are kept in memory, in a ring buffer
+    with a per-station index (plays, seconds listened, last played) that is
+    updated as entries enter and leave it. The log is compacted to the ring
+    buffer once it holds twice that many lines.
+    """
+
+    def __init__(self, path=None, max_entries=config.HISTORY_MAX_ENTRIES,
+                 fsync_every=config.HISTORY_FSYNC_EVERY, fsync_interval=config.HISTORY_FSYNC_INTERVAL):
+        self.path = path or os.path.join(user_data_dir("fmcli"), "history.jsonl")
+        self.max_entries = max_entries
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._entries = None
+        self._stations = {}
+        self._log = None
+        self._lines = 0
+        self._unsynced = 0
+        self._synced_at = 0.0
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = deque(maxlen=self.max_entries)
+        self._stations = {}
+        self._lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            lines = []
+        self._lines = len(lines)
+        lines = [line for line in lines[-self.max_entries:] if line]
+        try:
+            # One decode for the whole tail is several times faster than one per line
+            entries = json.loads("[" + ",".join(lines) + "]")
+        except ValueError:
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # torn last line after a crash
+        # Build the station index in one pass; the slice above already bounds the buffer
+        self._entries.extend(entries)
+        stations = self._stations
+        for entry in entries:
+            key = (entry["name"], entry["location"])
+            stats = stations.get(key)
+            if stats is None:
+                stats = stations[key] = {"name": key[0], "location": key[1], "plays": 0, "seconds": 0.0, "last": 0.0}
+            stats["plays"] += 1
+            stats["seconds"] += entry["seconds"]
+            if entry["started"] > stats["last"]:
+                stats["last"] = entry["started"]
+
+    def _push(self, entry):
+        if len(self._entries) == self._entries.maxlen:
+            old = self._entries[0]
+            stats = self._stations[_key(old)]
+            stats["plays"] -= 1
+            stats["seconds"] -= old["seconds"]
+            if not stats["plays"]:
+                del self._stations[_key(old)]
+        self._entries.append(entry)
+        stats = self._stations.get(_key(entry))
+        if stats is None:
+            stats = self._stations[_key(entry)] = {"name": entry["name"], "location": entry["location"],
+                                                   "plays": 0, "seconds": 0.0, "last": 0.0}
+        stats["plays"] += 1
+        stats["seconds"] += entry["seconds"]
+        stats["last"] = max(stats["last"], entry["started"])
+
+    def _append(self, entry):
+        if self._log is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._log = open(self.path, "a", encoding="utf-8")
+        self._log.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._log.flush()
+        self._lines += 1
+        self._unsynced += 1
+        now = time.monotonic()
+        if self._unsynced >= self.fsync_every or now - self._synced_at >= self.fsync_interval:
+            os.fsync(self._log.fileno())
+            self._unsynced = 0
+            self._synced_at = now
+        if self._lines >= 2 * self.max_entries:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the log as just the ring buffer, atomically."""
+        self._close_log()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in self._entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._lines = len(self._entries)
+
+    def start(self, station, stream):
+        """Begin a listen. Returns the pending entry to hand to finish()."""
+        return {"name": station["name"], "location": station.get("location", "N/A"), "url": stream["url"],
+                "codec": stream.get("codec", "N/A"), "bitrate": stream.get("bitrate", "N/A"),
+                "started": time.time(), "seconds": 0.0}
+
+    def finish(self, entry):
+        """Record a listen with its duration, measured from start() until now."""
+        entry["seconds"] = round(max(0.0, time.time() - entry["started"]), 1)
+        with self._lock:
+            self._load()
+            self._push(entry)
+            self._append(entry)
+
+    def recent(self, limit=20):
+        """Most recent listens first."""
+        with self._lock:
+            self._load()
+            n = min(limit, len(self._entries))
+            return [self._entries[-i] for i in range(1, n + 1)]
+
+    def recently_played(self, limit=10):
+        """Distinct stations, most recently played first."""
+        with self._lock:
+            self._load()
+            stations = list(self._stations.values())
+        return sorted(stations, key=lambda s: -s["last"])[:limit]
+
+    def most_played(self, limit=10):
+        """Distinct stations by number of listens, then time listened."""
+        with self._lock:
+            self._load()
+            stations = list(self._stations.values())
+        return sorted(stations, key=lambda s: (-s["plays"], -s["seconds"]))[:limit]
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def _close_log(self):
+        if self._log is not None:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+            self._log = None
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            self._close_log()
+
+
+playback_history = PlaybackHistory()
+
+
+def _duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
 
-history = []
 
 def add_to_history(station, stream):
-    """Add a station/stream to history."""
-    global history
-    history.append({"station": station, "stream": stream})
+    """Start a history entry for a station/stream; pass the result to finish_history when playback stops."""
+    return playback_history.start(station, stream)
+
+def finish_history(entry):
+    """Record the listen started by add_to_history, with its duration."""
+    playback_history.finish(entry)
 
 def show_history():
     clear_console()
     """Display the playback history."""
-    if not history:
+    recent = playback_history.recent()
+    if not recent:
         console.print("[yellow]📜 History is empty.[/]")
         return
 
     table = Table(title="🎵 Playback History", header_style="bold magenta")
     table.add_column("No.", justify="center")
     table.add_column("Station", style="bold cyan")
+    table.add_column("Played", style="yellow")
+    table.add_column("Listened", justify="right")
     table.add_column("Stream URL", style="green")
 
-    for i, item in enumerate(history, 1):
-        table.add_row(str(i), item["station"]["name"], item["stream"]["url"])
+    for i, item in enumerate(recent, 1):
+        played = time.strftime("%Y-%m-%d %H:%M", time.localtime(item["started"]))
+        table.add_row(str(i), item["name"], played, _duration(item["seconds"]), item["url"])
 
     console.print(table)
 
-def get_icy_metadata_robust(stream_url: str) -> dict:
-    """
-    Connects to an Icecast/SHOUTcast stream and extracts the initial ICY headers
-    and the first StreamTitle from the interleaved metadata, using a robust reader.
-    """
-
-    headers = {'Icy-MetaData': '1', 'User-Agent': 'PythonIcyReader/1.0'}
-    metadata = {}
-
-    try:
-        with requests.get(stream_url, headers=headers, stream=True, timeout=10) as response:
-            response.raise_for_status()
-
-            # --- Extract Header Metadata ---
-            metadata = {
-                'stream_name': response.headers.get('icy-name', 'N/A'),
-                'stream_genre': response.headers.get('icy-genre', 'N/A'),
-                'stream_bitrate': response.headers.get('icy-br', 'N/A'),
-                'current_title': 'N/A'
-            }
-
-            # --- Extract Interleaved Metadata (StreamTitle) ---
-            metaint_header = response.headers.get('icy-metaint')
-            if not metaint_header:
-                return metadata
-
-            metaint = int(metaint_header)
-
-            # Skip the audio data (metaint bytes)
-            audio_data = read_fully(response.raw, metaint)
-            if audio_data is None:
-                return metadata
-
-            # Read the metadata size byte (1 byte)
-            metadata_size_byte = read_fully(response.raw, 1)
-            if metadata_size_byte is None:
-                return metadata
-
-            # Calculate metadata length: byte value * 16
-            metadata_length = struct.unpack('B', metadata_size_byte)[0] * 16
-
-            if metadata_length == 0:
-                return metadata
-
-            # Read the actual metadata block
-            metadata_bytes = read_fully(response.raw, metadata_length)
-
-            if metadata_bytes:
-                metadata_str = metadata_bytes.decode('latin-1', errors='ignore').strip('\x00')
-                match = re.search(r"StreamTitle='([^']*)';", metadata_str)
-                if match:
-                    metadata['current_title'] = match.group(1).strip()
+    top = Table(title="🏆 Most Played", header_style="bold magenta")
+    top.add_column("Station", style="bold cyan")
+    top.add_column("Location", style="green")
+    top.add_column("Plays", justify="right")
+    top.add_column("Listened", justify="right")
 
-            return metadata
+    for st in playback_history.most_played(5):
+        top.add_row(st["name"], st["location"], str(st["plays"]), _duration(st["seconds"]))
 
-    except requests.exceptions.RequestException as e:
-        metadata['error'] = str(e)
-        return metadata
+    console.print(top)
@@ -0,0 +1,397 @@
+import re
+import socket
+import threading
+import time
+import requests
+import config
+import tracing
+import transport
+
+ICY_HEADERS = {"Icy-MetaData": "1", "User-Agent": "PythonIcyReader/1.0"}
+AUDIO_CHUNK = 16 * 1024
+MAX_METADATA = 255 * 16
+
+# Key='value'; pairs. Values may contain quotes, so a value ends only at "';"
+# followed by another key (whitespace allowed in between) or the end of the block.
+_METADATA_PAIR = re.compile(r"(\w+)='(.*?)';(?=\s*\w+=|\s*$)", re.S)
+
+_AUDIO, _LENGTH, _METADATA = 0, 1, 2
+
+
+def parse_icy_headers(headers) -> dict:
+    """Header metadata: stream_name, stream_genre and stream_bitrate ("N/A" when missing)."""
+    return {
+        "stream_name": headers.get("icy-name", "N/A"),
+        "stream_genre": headers.get("icy-genre", "N/A"),
+        "stream_bitrate": headers.get("icy-br", "N/A"),
+    }
+
+
+def parse_metadata(block) -> dict:
+    """Decode one metadata block into {key: value}, e.g. StreamTitle, StreamUrl."""
+    raw = bytes(block).rstrip(b"\x00")
+    try:
+        text = raw.decode("utf-8")
+    except UnicodeDecodeError:
+        text = raw.decode("latin-1")  # the traditional ICY encoding
+    return {key: value.strip() for key, value in _METADATA_PAIR.findall(text.strip())}
+
+
+class IcyParser:
+    """
+    Incremental ICY demultiplexer.
+
+    feed() accepts chunks of any size, split anywhere. Audio is passed to
+    `on_audio` as memoryview slices of the caller's chunk (no copying; the
+    view is only valid during the callback). Metadata blocks are assembled in
+    a fixed bytearray and passed to `on_metadata` as parsed dicts; empty
+    blocks only advance `intervals`. With metaint=0 the whole stream is audio.
+    """
+
+    __slots__ = ("metaint", "on_audio", "on_metadata", "audio_bytes", "metadata_blocks", "intervals",
+                 "_state", "_audio_left", "_meta_len", "_meta_pos", "_meta_buf")
+
+    def __init__(self, metaint, on_audio=None, on_metadata=None):
+        self.metaint = metaint
+        self.on_audio = on_audio
+        self.on_metadata = on_metadata
+        self.audio_bytes = 0
+        self.metadata_blocks = 0
+        self.intervals = 0
+        self._state = _AUDIO
+        self._audio_left = metaint
+        self._meta_len = 0
+        self._meta_pos = 0
+        self._meta_buf = bytearray(MAX_METADATA)
+
+    def pending(self) -> int:
+        """Bytes still needed to reach the end of the current metadata interval."""
+        if not self.metaint or self._state == _LENGTH:
+            return 1
+        if self._state == _AUDIO:
+            return self._audio_left + 1
+        return self._meta_len - self._meta_pos
+
+    def feed(self, data):
+        view = data if isinstance(data, memoryview) else memoryview(data)
+        end = len(view)
+        if not self.metaint:
+            self.audio_bytes += end
+            if self.on_audio and end:
+                self.on_audio(view)
+            return
+
+        pos = 0
+        while pos < end:
+            state = self._state
+            if state == _AUDIO:
+                take = min(self._audio_left, end - pos)
+                if self.on_audio:
+                    self.on_audio(view[pos:pos + take])
+                pos += take
+                self.audio_bytes += take
+                self._audio_left -= take
+                if not self._audio_left:
+                    self._state = _LENGTH
+            elif state == _LENGTH:
+                self._meta_len = view[pos] * 16
+                pos += 1
+                if self._meta_len:
+                    self._meta_pos = 0
+                    self._state = _METADATA
+                else:
+                    self.intervals += 1
+                    self._audio_left = self.metaint
+                    self._state = _AUDIO
+            else:
+                take = min(self._meta_len - self._meta_pos, end - pos)
+                self._meta_buf[self._meta_pos:self._meta_pos + take] = view[pos:pos + take]
+                pos += take
+                self._meta_pos += take
+                if self._meta_pos == self._meta_len:
+                    self.metadata_blocks += 1
+                    self.intervals += 1
+                    if self.on_metadata:
+                        self.on_metadata(parse_metadata(memoryview(self._meta_buf)[:self._meta_len]))
+                    self._audio_left = self.metaint
+                    self._state = _AUDIO
+
+
+def read_available(raw, size):
+    """
+    Read up to `size` bytes from a urllib3 response, returning as soon as any
+    are available. raw.read() waits for the full `size`, which at 128 kbps
+    holds audio back for a second and delays stop() until the read completes.
+    """
+    fp = getattr(raw, "_fp", None)
+    if fp is not None and hasattr(fp, "read1"):
+        return fp.read1(size)
+    return raw.read(size, decode_content=False)
+
+
+def interrupt(response):
+    """
+    Wake a thread blocked reading a streaming response, which then closes it.
+    The socket is shut down rather than closed: close() waits for the
+    reader's buffer lock, i.e. until data arrives or the read times out, and
+    on a stalled stream that is the whole read timeout.
+    """
+    try:
+        response.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError):
+        response.close()  # already closed, or not a plain socket stream
+
+
+@tracing.traced("icy.fetch_metadata")
+def fetch_icy_metadata(stream_url: str, session=transport, timeout=None) -> dict:
+    """
+    Connect to an Icecast/SHOUTcast stream and return its header metadata
+    plus the first StreamTitle (as `current_title`) and all keys of the first
+    metadata block (as `fields`), then drop the connection.
+    """
+    metadata = {}
+    try:
+        with session.get(stream_url, headers=ICY_HEADERS, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            metadata = parse_icy_headers(response.headers)
+            metadata["current_title"] = "N/A"
+
+            metaint = int(response.headers.get("icy-metaint") or 0)
+            if not metaint:
+                return metadata
+
+            # Read exactly one metadata interval: audio, length byte, block.
+            blocks = []
+            parser = IcyParser(metaint, on_metadata=blocks.append)
+            while not parser.intervals:
+                chunk = response.raw.read(min(AUDIO_CHUNK, parser.pending()), decode_content=False)
+                if not chunk:
+                    return metadata
+                parser.feed(chunk)
+
+            if blocks:
+                metadata["fields"] = blocks[0]
+                if blocks[0].get("StreamTitle"):
+                    metadata["current_title"] = blocks[0]["StreamTitle"]
+            return metadata
+
+    except requests.exceptions.RequestException as e:
+        metadata["error"] = str(e)
+        return metadata
+
+
+class IcyDemuxer:
+    """
+    Reads a stream over a single connection with `Icy-MetaData: 1`, writes the
+    audio (with the metadata blocks removed) to `sink` and reports each new
+    StreamTitle through `on_title` as soon as its block arrives.
+
+    `sink` is any binary file object, normally ffplay's stdin, or None. While
+    a recorder is attached the same audio also goes to it, split at each new
+    title in stream order, so playback and recording share one write path.
+    """
+
+    def __init__(self, url, sink, on_title=None, on_headers=None, recorder=None):
+        self.url = url
+        self.sink = sink
+        self.recorder = recorder
+        self.on_title = on_title
+        self.on_headers = on_headers
+        self.error = None
+        self.content_type = None  # the response's Content-Type, once connected
+        self.bytes_received = 0
+        self.last_data_at = None  # time.monotonic() of the last read, for stall detection
+        self._last_title = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._response = None
+        self._record_lock = threading.Lock()
+
+    def set_recorder(self, recorder):
+        """
+        Attach `recorder` (or detach with None) between two reads. Returns the
+        previous recorder, which the caller closes.
+        """
+        with self._record_lock:
+            previous, self.recorder = self.recorder, recorder
+            if recorder is not None and recorder.content_type is None:
+                recorder.content_type = self.content_type
+            if recorder is not None and self._last_title:
+                recorder.split(self._last_title)
+        return previous
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fmcli-icy-demux", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._response is not None:
+            interrupt(self._response)  # unblocks a pending read
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def is_alive(self):
+        """True while the connection is being read."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _on_audio(self, data):
+        if self.sink is not None:
+            self.sink.write(data)
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.write(data)
+
+    def _on_metadata(self, fields):
+        title = fields.get("StreamTitle")
+        if title and title != self._last_title:
+            self._last_title = title
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.split(title)
+            if self.on_title:
+                self.on_title(title)
+
+    @property
+    def title(self):
+        """The last StreamTitle seen, or None."""
+        return self._last_title
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            with tracing.span("icy.connect", url=self.url):
+                response = transport.get(self.url, headers=ICY_HEADERS, stream=True)
+            with response:
+                self._response = response
+                response.raise_for_status()
+                with self._record_lock:
+                    self.content_type = response.headers.get("content-type")
+                    if self.recorder is not None and self.recorder.content_type is None:
+                        self.recorder.content_type = self.content_type
+                if self.on_headers:
+                    self.on_headers(parse_icy_headers(response.headers))
+
+                metaint = int(response.headers.get("icy-metaint") or 0)
+                parser = IcyParser(metaint, on_audio=self._on_audio, on_metadata=self._on_metadata)
+                while not self._stopped.is_set():
+                    chunk = read_available(response.raw, AUDIO_CHUNK)
+                    if not chunk:
+                        return
+                    if not self.bytes_received:
+                        tracing.add("icy.first_read", started, time.perf_counter(), url=self.url)
+                    self.bytes_received += len(chunk)
+                    self.last_data_at = time.monotonic()
+                    with self._record_lock:
+                        parser.feed(chunk)
+                    if self.sink is not None:
+                        self.sink.flush()
+        except requests.exceptions.RequestException as e:
+            self.error = str(e)
+        except (ValueError, OSError):
+            pass  # player went away or we were stopped
+        finally:
+            try:
+                if self.sink is not None:
+                    self.sink.close()  # lets ffplay -autoexit finish
+            except OSError:
+                pass
+            recorder = self.set_recorder(None)
+            if recorder is not None:
+                recorder.close()
+
+
+class MetadataWatcher:
+    """
+    Keeps a single metadata connection open and reports every StreamTitle
+    change through `on_update`, discarding the audio in between. It only
+    reconnects when the connection fails, with exponential backoff. A stream
+    without `icy-metaint` has no titles to watch: its headers are reported
+    and the watcher stops.
+
+    Used when ffplay opens the stream itself (direct mode).
+    """
+
+    def __init__(self, url, on_update, backoff_max=config.METADATA_BACKOFF_MAX):
+        self.url = url
+        self.on_update = on_update
+        self.backoff_max = backoff_max
+        self.connections = 0
+        self.bytes_discarded = 0
+        self.time_to_first_title = None
+        self.no_metadata = False  # the server sends no interleaved titles
+        self._started_at = None
+        self._last_title = None
+        self._stopped = threading.Event()
+        self._response = None
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "bytes_discarded": self.bytes_discarded,
+            "time_to_first_title": self.time_to_first_title,
+            "no_metadata": self.no_metadata,
+        }
+
+    def start(self):
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="fmcli-icy-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._response is not None:
+            interrupt(self._response)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _on_metadata(self, fields):
+        title = fields.get("StreamTitle")
+        if not title or title == self._last_title:
+            return
+        if self.time_to_first_title is None:
+            self.time_to_first_title = time.monotonic() - self._started_at
+        self._last_title = title
+        self.on_update({"current_title": title})
+
+    def _watch_once(self):
+        """One connection's lifetime. Returns True if it delivered any data."""
+        with tracing.span("icy.connect", url=self.url):
+            response = transport.get(self.url, headers=ICY_HEADERS, stream=True)
+        with response:
+            self._response = response
+            self.connections += 1
+            response.raise_for_status()
+            self.on_update({k: v for k, v in parse_icy_headers(response.headers).items() if v != "N/A"})
+
+            metaint = int(response.headers.get("icy-metaint") or 0)
+            if not metaint:
+                # No interleaved titles to wait for; the headers were all there is
+                self.no_metadata = True
+                return True
+
+            parser = IcyParser(metaint, on_metadata=self._on_metadata)
+            received = False
+            while not self._stopped.is_set():
+                chunk = response.raw.read(min(AUDIO_CHUNK, parser.pending()), decode_content=False)
+                if not chunk:
+                    break
+                before = parser.audio_bytes
+                parser.feed(chunk)
+                self.bytes_discarded += parser.audio_bytes - before
+                received = True
+            return received
+
+    def _run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            try:
+                if self._watch_once():
+                    backoff = 1
+            except (requests.exceptions.RequestException, ValueError, OSError):
+                pass
+            if self._stopped.is_set() or self.no_metadata:
+                return
+            self._stopped.wait(backoff)
+            backoff = min(backoff * 2, self.backoff_max)
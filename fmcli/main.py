@@ -5,39 +5,56 @@ from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.align import Align
 from rich.text import Text
+import tracing
 from utils import clear_console
-from search import search_stations, show_station_list, show_streams
-from player import play_stream_ffplay
-from history import add_to_history, show_history
-from favorites import add_favorite, remove_favorite, show_favorites
+from history import add_to_history, finish_history, show_history, playback_history
+from favorites import (add_favorite, remove_favorite, show_favorites, resolve_favorite, is_stale,
+                       revalidate_in_background)
 from logo import get_logo_panel
 
+# search, player and friends pull in requests, lxml, sqlite and asyncio. They are
+# imported where they are first needed so the menu appears without waiting on them.
 
-def main():
-    global history
-    history = []
 
-    while True:
-        clear_console()
-        layout = get_logo_panel()
-        console.print(layout)
-
-        # Header
-        header_text = Text("🎧 FMStream Radio CLI", style="bold magenta", justify="center")
-        subtext = Text("(s) Search stations   (h) History   (f) Favorites   (q) Quit",
-                       style="bold cyan", justify="center")
-        full_text = Text.assemble(header_text, "\n", subtext)
-
-        console.print(
-            Panel(
-                Align.center(full_text),
-                border_style="bright_magenta",
-                padding=(1, 4),
-                title="[bold yellow]🎵 Welcome![/]",
-                expand=False
-            )
+@tracing.traced("menu.draw")
+def show_menu():
+    clear_console()
+    layout = get_logo_panel()
+    console.print(layout)
+
+    # Header
+    header_text = Text("🎧 FMStream Radio CLI", style="bold magenta", justify="center")
+    subtext = Text("(s) Search stations   (l) Local search   (h) History   (f) Favorites   (q) Quit",
+                   style="bold cyan", justify="center")
+    full_text = Text.assemble(header_text, "\n", subtext)
+
+    console.print(
+        Panel(
+            Align.center(full_text),
+            border_style="bright_magenta",
+            padding=(1, 4),
+            title="[bold yellow]🎵 Welcome![/]",
+            expand=False
         )
+    )
+
 
+def shutdown():
+    """Stop background workers, but only those that were actually started."""
+    if "prefetch" in sys.modules:
+        sys.modules["prefetch"].prefetcher.shutdown()
+    if "browser" in sys.modules:
+        sys.modules["browser"].browser_pool.shutdown()
+    playback_history.close()
+    if "backends" in sys.modules:
+        sys.modules["backends"].close_backends()
+    if "transport" in sys.modules:
+        sys.modules["transport"].close()
+
+
+def main():
+    while True:
+        show_menu()
         action = Prompt.ask("[bold green]Choose an action[/]").strip().lower()
 
         # --- Quit ---
@@ -45,21 +62,40 @@ def main():
             console.print("[yellow]👋 Exiting player.[/]")
             break
 
-        # --- Search Stations ---
-        elif action == "s":
+        # --- Search Stations (s = fmstream.org, l = local index) ---
+        elif action in ("s", "l"):
+            with tracing.span("main.load_search"):
+                from search import search_stations, search_local, show_station_list, show_streams
+                from prefetch import NOT_PREFETCHED, prefetcher
+                from prober import probe_streams
+                from player import play_stream
+                from station_index import station_index
+            station_index.start_background_refresh()
+
             query = Prompt.ask("[bold green]Enter station name (b=back)[/]").strip()
             if query.lower() == "b":
                 continue
 
             start_index = 0
             while True:
-                results, prev_link, next_link = search_stations(query, start_index)
+                with tracing.span("main.search_page", local=action == "l", page=start_index):
+                    if action == "l":
+                        results, prev_link, next_link = search_local(query)
+                    else:
+                        page = prefetcher.take(query, start_index)
+                        if page is NOT_PREFETCHED:
+                            page = search_stations(query, start_index)
+                        results, prev_link, next_link = page
                 if not results:
+                    prefetcher.cancel()
                     console.print("[red]❌ No stations found.[/]")
                     time.sleep(2)
                     break
 
                 show_station_list(results)
+                # Load the neighbouring pages while the user reads this one
+                prefetcher.prefetch(query, next_link)
+                prefetcher.prefetch(query, prev_link)
                 options = "[bold cyan]Select a station number[/] (b=back)"
                 if prev_link is not None:
                     options += " (p) Previous"
@@ -68,6 +104,7 @@ def main():
                 choice = Prompt.ask(options).strip().lower()
 
                 if choice == "b":
+                    prefetcher.cancel()
                     break
                 if choice == "p" and prev_link is not None:
                     start_index = prev_link
@@ -82,10 +119,12 @@ def main():
 
                 station = results[int(choice) - 1]
 
+                probes = None
                 while True:
-                    show_streams(station)
+                    streams, best = show_streams(station, probes)
                     stream_choice = Prompt.ask(
-                        "[bold cyan]Select stream number to play (b=back, a=add to favorites)[/]"
+                        "[bold cyan]Select stream number to play (b=back, a=add to favorites, t=test streams)[/]",
+                        default=str(best + 1) if best is not None else None,
                     ).strip().lower()
 
                     if stream_choice == "b":
@@ -93,13 +132,17 @@ def main():
                     if stream_choice == "a":
                         add_favorite(station)
                         continue
-                    if not stream_choice.isdigit() or not (1 <= int(stream_choice) <= len(station["streams"])):
+                    if stream_choice == "t":
+                        console.print("[cyan]⏱️ Testing streams...[/]")
+                        probes = {r["url"]: r for r in probe_streams(station["streams"])}
+                        continue
+                    if not stream_choice.isdigit() or not (1 <= int(stream_choice) <= len(streams)):
                         console.print("[red]❌ Invalid stream choice.[/]")
                         time.sleep(1)
                         continue
 
                     # Get selected stream
-                    stream = station["streams"][int(stream_choice) - 1]
+                    stream = streams[int(stream_choice) - 1]
                     stream.update({
                         "station_name": station["name"],
                         "station_genre": station["genre"],
@@ -108,9 +151,10 @@ def main():
                     })
 
                     # Add to history and auto-play
-                    add_to_history(station, stream)
+                    entry = add_to_history(station, stream)
                     console.print(f"[bold yellow]🎵 Now playing: {stream['station_name']}[/]")
-                    play_stream_ffplay(stream)
+                    play_stream(stream, alternates=streams, probes=probes)
+                    finish_history(entry)
                     console.print("[cyan]↩️ Returning to station list...[/]")
                     time.sleep(1)
                     break
@@ -140,28 +184,40 @@ def main():
                     continue
 
                 if choice.isdigit() and 1 <= int(choice) <= len(favorites):
+                    from search import show_streams
+                    from player import play_stream
                     station = favorites[int(choice) - 1]
-                    results, _, _ = search_stations(station["name"])
-                    if not results:
-                        console.print("[red]❌ Could not fetch live streams.[/]")
-                        continue
 
-                    live_station = results[0]
-                    show_streams(live_station)
+                    # Play from the stored streams; only favorites saved before streams
+                    # were stored need a live lookup first
+                    if not station.get("streams"):
+                        console.print("[cyan]🔎 Resolving streams...[/]")
+                        station = resolve_favorite(station, quiet=False)
+                        if station is None:
+                            console.print("[red]❌ Could not fetch live streams.[/]")
+                            continue
+                    elif is_stale(station):
+                        revalidate_in_background(station)
+
+                    streams, _ = show_streams(station)
                     stream_choice = Prompt.ask("[bold cyan]Select stream to play (b=back)[/]").strip().lower()
                     if stream_choice == "b":
                         continue
-                    if stream_choice.isdigit() and 1 <= int(stream_choice) <= len(live_station["streams"]):
-                        stream = live_station["streams"][int(stream_choice) - 1]
+                    if stream_choice.isdigit() and 1 <= int(stream_choice) <= len(streams):
+                        stream = dict(streams[int(stream_choice) - 1])
                         stream.update({
-                            "station_name": live_station["name"],
-                            "station_genre": live_station["genre"],
-                            "station_location": live_station["location"],
-                            "station_description": live_station["description"],
+                            "station_name": station["name"],
+                            "station_genre": station.get("genre", "N/A"),
+                            "station_location": station.get("location", "N/A"),
+                            "station_description": station.get("description", ""),
                         })
-                        add_to_history(live_station, stream)
+                        entry = add_to_history(station, stream)
                         console.print(f"[bold yellow]🎵 Now playing: {stream['station_name']}[/]")
-                        play_stream_ffplay(stream)
+                        result = play_stream(stream, alternates=streams)
+                        finish_history(entry)
+                        if result == "failed":
+                            console.print("[yellow]⚠️ Stored stream failed; refreshing this favorite in the background.[/]")
+                            revalidate_in_background(station)
                         console.print("[cyan]↩️ Returning to favorites...[/]")
                         time.sleep(1)
         else:
@@ -170,5 +226,40 @@ def main():
 
 
 if __name__ == "__main__":
+    import argparse
+
+    import config
+    from cli import add_subcommands, run
+
+    parser = argparse.ArgumentParser(description="FMStream radio CLI. Without a command, starts the interactive menu.")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print an import-time breakdown of startup and exit")
+    parser.add_argument("--profile", action="store_true",
+                        help="time search, parsing, rendering and playback startup; print percentiles at exit")
+    parser.add_argument("--trace", metavar="FILE", default=config.TRACE_FILE or None,
+                        help="also write the timings as Chrome trace-event JSON (implies --profile)")
+    add_subcommands(parser)
+    args = parser.parse_args()
+    if args.profile or args.trace:
+        tracing.enable()
+
+    if args.startup_profile:
+        from startup import print_startup_profile
+        print_startup_profile()
+        sys.exit(0)
+
+    if args.command:
+        try:
+            sys.exit(run(args))
+        finally:
+            shutdown()
+            if tracing.enabled():
+                tracing.report(args.trace)
+
     sys.stdout.reconfigure(line_buffering=True)
-    main()
+    try:
+        main()
+    finally:
+        shutdown()
+        if tracing.enabled():
+            tracing.report(args.trace)
@@ -1,98 +1,393 @@
 import threading
 import itertools
-import subprocess
+import os
+import select
+import selectors
 import time
 import sys
 import termios
 import tty
-import select
 import signal
+from contextlib import contextmanager
 from rich.panel import Panel
 from rich.live import Live
 from rich.console import Console
-from utils import get_icy_metadata_robust  # your robust metadata fetcher
+from rich.markup import escape
+from backends import get_backend
+from icy import MetadataWatcher
+from prober import advertised_kbps
+from supervisor import Supervisor, end_reason
+from adaptive import AdaptiveController
+import config
+import tracing
 
 console = Console()
 
 # ---------- Stream Control Functions ----------
 
-def pause_stream_ffplay(process, paused_event, status):
-    """Pause ffplay playback."""
-    if process.poll() is None and not paused_event.is_set():
-        process.send_signal(signal.SIGSTOP)
+def pause_stream(playback, paused_event, status):
+    """Pause playback."""
+    if playback.poll() is None and not paused_event.is_set():
+        playback.pause()
         paused_event.set()
         status["state"] = "paused"
-        # console.print("[yellow]⏸️ Paused[/]")
 
-def resume_stream_ffplay(process, paused_event, status):
-    """Resume ffplay playback."""
-    if process.poll() is None and paused_event.is_set():
-        process.send_signal(signal.SIGCONT)
+def resume_stream(playback, paused_event, status):
+    """Resume playback."""
+    if playback.poll() is None and paused_event.is_set():
+        playback.resume()
         paused_event.clear()
         status["state"] = "playing"
-        # console.print("[green]▶️ Resumed[/]")
 
-def stop_stream_ffplay(process, stopped_event, status):
-    """Stop ffplay playback."""
-    if process.poll() is None:
-        # console.print("[red]⏹️ Stopping playback...[/]")
+def toggle_recording(playback, status):
+    """Start or stop recording."""
+    if playback.recorder is not None:
+        stats = playback.stop_recording()
+        status["recorded"] = stats
+        return True
+    return playback.start_recording(status.get("station") or "Unknown")
+
+
+def stop_stream(playback, stopped_event, status):
+    """Stop playback."""
+    if playback.poll() is None:
         stopped_event.set()
         status["state"] = "stopped"
-        process.terminate()
-        try:
-            process.wait(timeout=2)
-        except Exception:
-            process.kill()
+        playback.stop()
 
 # ---------- Key Input Handling ----------
 
-def read_key_nonblocking():
-    """Read a single key without blocking."""
-    fd = sys.stdin.fileno()
+class Wakeup:
+    """Self-pipe that lets other threads wake the player loop's select()."""
+
+    def __init__(self):
+        self._r, self._w = os.pipe()
+        os.set_blocking(self._r, False)
+        os.set_blocking(self._w, False)
+        self._closed = False
+
+    def fileno(self):
+        return self._r
+
+    def set(self):
+        if self._closed:
+            return  # a late metadata thread; the fd numbers may belong to something else by now
+        try:
+            os.write(self._w, b"\0")
+        except (BlockingIOError, OSError):
+            pass  # already pending, or closed after playback ended
+
+    def drain(self):
+        try:
+            while os.read(self._r, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self):
+        self._closed = True
+        os.close(self._r)
+        os.close(self._w)
+
+
+@contextmanager
+def _cbreak(fd):
+    """
+    Put the terminal in cbreak mode for the whole block and restore it on any
+    exit, including SIGTERM/SIGHUP, which are turned into SystemExit meanwhile.
+    """
+    if fd is None:
+        yield
+        return
     old_settings = termios.tcgetattr(fd)
+    handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        for sig in (signal.SIGTERM, signal.SIGHUP):
+            handlers[sig] = signal.signal(sig, lambda signum, frame: sys.exit(128 + signum))
     try:
         tty.setcbreak(fd)
-        if sys.stdin in select.select([sys.stdin], [], [], 0.1)[0]:
-            return sys.stdin.read(1)
+        yield
     finally:
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-    return None
+        for sig, handler in handlers.items():
+            signal.signal(sig, handler)
 
-def handle_key_input(process, stopped_event, paused_event, status):
+
+def _stdin_fd():
+    try:
+        return sys.stdin.fileno() if sys.stdin.isatty() else None
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def handle_key(key, playback, stopped_event, paused_event, status):
     """
-    Listen for key presses:
+    Act on one key press. Returns True if it changed anything:
       p = pause
       r = resume
       s = stop
+      l = jump to live (after a pause)
+      c = start/stop recording
       b = back
     """
-    while not stopped_event.is_set():
-        key = read_key_nonblocking()
-        if not key:
-            continue
-
-        if key.lower() == "p":
-            pause_stream_ffplay(process, paused_event, status)
-        elif key.lower() == "r":
-            resume_stream_ffplay(process, paused_event, status)
-        elif key.lower() == "s":
-            stop_stream_ffplay(process, stopped_event, status)
-        elif key.lower() == "b":
-            console.print("[blue]⬅️ Returning to main menu...[/]")
-            stop_stream_ffplay(process, stopped_event, status)
-            break
+    key = key.lower()
+    if key == "p":
+        pause_stream(playback, paused_event, status)
+    elif key == "r":
+        resume_stream(playback, paused_event, status)
+    elif key == "s":
+        stop_stream(playback, stopped_event, status)
+    elif key == "l":
+        if not playback.go_live():
+            return False
+        resume_stream(playback, paused_event, status)
+    elif key == "c":
+        return toggle_recording(playback, status)
+    elif key == "b":
+        console.print("[blue]⬅️ Returning to main menu...[/]")
+        stop_stream(playback, stopped_event, status)
+    else:
+        return False
+    return True
 
 # ---------- Main Player Function ----------
 
-def play_stream_ffplay(stream):
+def _timing_line(playback):
+    """Time to first audio (and switch/stop latency when known), for the player panel."""
+    stats = playback.stats()
+    if stats["first_audio"] is None:
+        return ""
+    line = f"first audio {stats['first_audio']:.2f}s"
+    if stats["switch"] is not None:
+        line += f" · switch {stats['switch']:.2f}s"
+    return f"[dim]{playback.backend}: {line}[/]\n"
+
+
+def _timeshift_line(playback):
+    """How far playback trails the live stream, once it is more than a second."""
+    behind = playback.behind_live()
+    if not behind or behind < 1:
+        return ""
+    minutes, seconds = divmod(int(behind), 60)
+    return f"[yellow]⏪ {minutes}:{seconds:02d} behind live · (l) Live[/]\n"
+
+
+def _recording_line(playback, status):
+    """Recording progress, or where the last recording went."""
+    recorder = playback.recorder
+    if recorder is not None:
+        stats = recorder.stats()
+        line = f"[red]● REC {stats['tracks']} tracks · {stats['bytes'] / 1e6:.1f} MB"
+        if stats["dropped_bytes"]:
+            line += f" · {stats['dropped_bytes'] / 1e6:.1f} MB dropped"
+        if stats["error"]:
+            line += f" · {escape(stats['error'])}"
+        return line + "[/]\n"
+    recorded = status.get("recorded")
+    if recorded:
+        return f"[dim]Saved {recorded['tracks']} tracks to {escape(recorded['path'])}[/]\n"
+    return ""
+
+
+def _reconnect_line(status):
+    """What the supervisor had to do so far, once it reconnected at all."""
+    supervisor = status.get("supervisor")
+    stats = supervisor.stats() if supervisor is not None else None
+    if not stats or not stats["reconnects"]:
+        return ""
+    return (f"[dim]🔄 {stats['reconnects']} reconnects · {stats['failovers']} failovers · "
+            f"{stats['downtime']:.0f}s without audio · last: {escape(stats['last_reason'] or '')}[/]\n")
+
+
+def _adaptive_line(status):
+    """Throughput and buffer estimate behind adaptive switching."""
+    controller = status.get("adaptive")
+    if controller is None:
+        return ""
+    stats = controller.stats()
+    if stats["kbps"] is None:
+        return ""
+    line = f"⇅ adaptive: {stats['kbps']:.0f}/{stats['bitrate']} kbps · {stats['buffer'] or 0:+.1f}s buffered"
+    if stats["down"] or stats["up"]:
+        line += f" · {stats['down']}↓ {stats['up']}↑"
+    if stats["probing"]:
+        line += " · probing up"
+    return f"[dim]{line}[/]\n"
+
+
+def _watcher_line(playback):
+    """Connection stats of the metadata watcher, for the player panel."""
+    source = getattr(playback, "source", None)
+    if not isinstance(source, MetadataWatcher):
+        return ""
+    stats = source.stats()
+    if stats["no_metadata"]:
+        return "[dim]Metadata: stream sends no titles[/]\n"
+    first = stats["time_to_first_title"]
+    first = f"{first:.1f}s" if first is not None else "—"
+    return (f"[dim]Metadata: {stats['connections']} conn · "
+            f"{stats['bytes_discarded'] / 1e6:.1f} MB discarded · first title {first}[/]\n")
+
+
+ANIMATION = ["▰▱▱▱▱", "▰▰▱▱▱", "▰▰▰▱▱", "▰▰▰▰▱", "▰▰▰▰▰", "▱▰▰▰▰"]
+STATE_LABELS = {
+    "playing": "[green]▶️ Playing[/]",
+    "paused": "[yellow]⏸️ Paused[/]",
+    "stopped": "[red]⏹️ Stopped[/]",
+}
+
+
+def _player_panel(status, metadata, bar, playback):
+    return Panel.fit(
+        f"{STATE_LABELS.get(status['state'], STATE_LABELS['stopped'])}\n\n"
+        f"[cyan]{metadata.get('stream_name')}[/]\n"
+        f"[green]Genre: {metadata.get('stream_genre')}[/]\n"
+        f"[magenta]Bitrate: {metadata.get('stream_bitrate')} kbps[/]\n\n"
+        f"[bold white]♪ {metadata.get('current_title')}[/]\n\n"
+        f"[dim]{bar} Streaming...[/]\n"
+        f"{_timeshift_line(playback)}"
+        f"{_recording_line(playback, status)}"
+        f"{_reconnect_line(status)}"
+        f"{_adaptive_line(status)}"
+        f"{_timing_line(playback)}"
+        f"{_watcher_line(playback)}"
+        f"[dim]Controls: (p) Pause  (r) Resume  (l) Live  (c) Record  (s) Stop  (b) Back[/]",
+        title="🎧 FMStream Player",
+        border_style="bright_blue"
+    )
+
+
+def run_player_view(playback, metadata, status, stopped, paused, wakeup, tick=config.PLAYER_TICK, out=None,
+                    check=None, check_every=1.0):
+    """
+    Draw the player panel and handle keys until playback stops or ends.
+
+    One selector waits on stdin (in cbreak mode for the whole call), the
+    backend's output descriptor if it has one (ffplay's stderr, whose EOF means
+    it exited), and `wakeup`, which metadata and backend events set. The panel is redrawn only after a key, a wakeup or an animation frame
+    every `tick` seconds; tick=0 turns the animation off, so an idle player
+    never wakes. `check`, if given, is called after each wakeup or backend
+    output and every `check_every` seconds, and the view returns early once it
+    returns True (play_stream uses it to leave a stalled stream or switch
+    variants). `check_every` may be a function returning the seconds until the
+    next check, or None for none until something happens. Returns the number
+    of redraws.
+    """
+    animation = itertools.cycle(ANIMATION)
+    bar = next(animation)
+    redraws = 0
+    stdin_fd = _stdin_fd()
+
+    def watch_exit():
+        def wait_for_exit():
+            playback.wait()
+            wakeup.set()
+
+        threading.Thread(target=wait_for_exit, name="fmcli-playback-wait", daemon=True).start()
+
+    sel = selectors.DefaultSelector()
+    sel.register(wakeup, selectors.EVENT_READ, "wakeup")
+    if stdin_fd is not None:
+        sel.register(stdin_fd, selectors.EVENT_READ, "key")
+    output_fd = playback.fileno()
+    if output_fd is not None:
+        sel.register(output_fd, selectors.EVENT_READ, "output")
+    else:
+        watch_exit()
+
+    try:
+        with _cbreak(stdin_fd), Live(console=out or console, auto_refresh=False) as live:
+            next_tick = time.monotonic() + tick
+            check_due = check is not None
+            next_check = None
+            dirty = True
+            while not stopped.is_set() and playback.poll() is None:
+                if dirty:
+                    with tracing.span("render.player_panel"):
+                        live.update(_player_panel(status, metadata, bar, playback), refresh=True)
+                    redraws += 1
+                    dirty = False
+
+                if check_due or (next_check is not None and time.monotonic() >= next_check):
+                    timed = not check_due
+                    check_due = False
+                    if check():
+                        break
+                    dirty = dirty or timed  # timed checks update the stats the panel shows
+                    interval = check_every() if callable(check_every) else check_every
+                    next_check = None if interval is None else time.monotonic() + interval
+
+                deadlines = ([next_tick] if tick else []) + ([next_check] if next_check is not None else [])
+                timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                events = sel.select(timeout)
+                if not events:
+                    if tick and time.monotonic() >= next_tick:
+                        bar = next(animation)  # animation tick, nothing else happened
+                        next_tick = time.monotonic() + tick
+                        dirty = True
+                    continue
+
+                for key, _ in events:
+                    if key.data == "wakeup":
+                        wakeup.drain()
+                        check_due = check is not None
+                        dirty = True
+                    elif key.data == "key":
+                        typed = os.read(stdin_fd, 32).decode("utf-8", "ignore")
+                        for k in typed:
+                            dirty = handle_key(k, playback, stopped, paused, status) or dirty
+                        check_due = check is not None
+                    elif key.data == "output":
+                        # ffplay's log is drained so it never blocks on a full pipe
+                        first_audio = playback.first_audio_at
+                        if not playback.on_readable():
+                            sel.unregister(output_fd)  # EOF: the player is exiting
+                            watch_exit()
+                        dirty = dirty or playback.first_audio_at != first_audio
+                        check_due = check is not None  # read errors arrive in the output
+    finally:
+        sel.close()
+    return redraws
+
+
+def _wait_to_reconnect(delay):
+    """Sleep `delay` seconds before reconnecting; s or b cancels. Returns False if cancelled."""
+    stdin_fd = _stdin_fd()
+    deadline = time.monotonic() + delay
+    with _cbreak(stdin_fd):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            if stdin_fd is None:
+                time.sleep(remaining)
+            elif select.select([stdin_fd], [], [], remaining)[0]:
+                if set(os.read(stdin_fd, 32).decode("utf-8", "ignore").lower()) & {"s", "b"}:
+                    return False
+
+
+def play_stream(stream, backend=None, alternates=None, probes=None, adaptive=None):
     """
     Play a stream with live metadata and interactive controls:
-    p = pause, r = resume, s = stop, b = back
+    p = pause, r = resume, s = stop, l = jump to live, c = record, b = back
+
+    Uses the configured audio backend unless one is given. When the stream
+    ends, fails or stalls without the user stopping it, a Supervisor
+    reconnects with backoff, falling back to the station's other streams
+    (`alternates`, ranked by `probes` where given). In adaptive mode (default
+    FMCLI_ADAPTIVE) an AdaptiveController moves between the bitrate variants
+    among them as throughput allows. Returns "done", "stopped", or "failed"
+    when no stream could be kept playing.
     """
-    url = stream["url"]
     stopped = threading.Event()
     paused = threading.Event()
-    animation = itertools.cycle(["▰▱▱▱▱", "▰▰▱▱▱", "▰▰▰▱▱", "▰▰▰▰▱", "▰▰▰▰▰", "▱▰▰▰▰"])
+    wakeup = Wakeup()
+    backend = backend or get_backend()
+    supervisor = Supervisor(stream, alternates or (), probes)
+    if adaptive is None:
+        adaptive = config.ADAPTIVE_ENABLED
+    controller = AdaptiveController(alternates, stream) if adaptive and alternates else None
+    stall_timeout = config.STALL_SECONDS if supervisor.attempts else 0
 
     metadata = {
         "stream_name": stream.get("station_name", "N/A"),
@@ -102,56 +397,90 @@ def play_stream_ffplay(stream):
     }
 
     # Shared status dictionary for live updates
-    status = {"state": "playing"}
+    status = {"state": "playing", "station": stream.get("station_name"), "supervisor": supervisor,
+              "adaptive": controller}
 
-    # Launch ffplay
-    cmd = ["ffplay", "-nodisp", "-hide_banner", "-autoexit", "-loglevel", "info", "-i", url]
-    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, bufsize=1)
+    def update_metadata(meta):
+        for key, value in meta.items():
+            if value and value != "N/A" and metadata.get(key) != value:
+                metadata[key] = value
+                wakeup.set()
 
-    # Metadata updater thread
-    def update_metadata():
-        while not stopped.is_set():
-            meta = get_icy_metadata_robust(url)
-            for key in ['stream_name', 'stream_genre', 'stream_bitrate', 'current_title']:
-                if meta.get(key):
-                    metadata[key] = meta[key]
-            time.sleep(5)
+    current = stream
+    recording = False
+    try:
+        while True:
+            status.update(state="playing", stalled=None, switch=None)
+            paused.clear()
+            metadata["stream_bitrate"] = current.get("bitrate", "N/A")
+            playback = backend.play(current["url"], update_metadata, on_event=wakeup.set,
+                                    bitrate=advertised_kbps(current))
+            if controller is not None:
+                controller.start(current)
+            if recording:
+                playback.start_recording(status["station"] or "Unknown")  # carry on in a new session
 
-    threading.Thread(target=update_metadata, daemon=True).start()
-    threading.Thread(target=handle_key_input, args=(process, stopped, paused, status), daemon=True).start()
+            def check(playback=playback):
+                if paused.is_set():
+                    return False
+                status["stalled"] = playback.stalled(stall_timeout) if stall_timeout else None
+                if controller is not None and not status["stalled"]:
+                    status["switch"] = controller.check(playback)
+                return bool(status["stalled"] or status["switch"])
 
-    try:
-        with Live(console=console, refresh_per_second=5) as live:
-            while not stopped.is_set() and process.poll() is None:
-                bar = next(animation)
-
-                # Determine status color and label
-                state = status["state"]
-                if state == "playing":
-                    state_label = "[green]▶️ Playing[/]"
-                elif state == "paused":
-                    state_label = "[yellow]⏸️ Paused[/]"
-                else:
-                    state_label = "[red]⏹️ Stopped[/]"
-
-                panel = Panel.fit(
-                    f"{state_label}\n\n"
-                    f"[cyan]{metadata.get('stream_name')}[/]\n"
-                    f"[green]Genre: {metadata.get('stream_genre')}[/]\n"
-                    f"[magenta]Bitrate: {metadata.get('stream_bitrate')} kbps[/]\n\n"
-                    f"[bold white]♪ {metadata.get('current_title')}[/]\n\n"
-                    f"[dim]{bar} Streaming...[/]\n"
-                    f"[dim]Controls: (p) Pause  (r) Resume  (s) Stop  (b) Back[/]",
-                    title="🎧 FMStream Player",
-                    border_style="bright_blue"
-                )
-                live.update(panel)
-                time.sleep(0.3)
-
-        process.wait()
-        status["state"] = "stopped"
-        return "done"
+            def check_in(playback=playback):
+                # Wake when the stream could first count as stalled, not on a
+                # fixed interval; the adaptive controller samples every second.
+                if paused.is_set():
+                    return None  # resuming is a key press, which re-checks
+                if controller is not None:
+                    return 1.0
+                return playback.stall_due_in(stall_timeout) if stall_timeout else None
+
+            try:
+                run_player_view(playback, metadata, status, stopped, paused, wakeup, check=check,
+                                check_every=check_in)
+                reason = status["stalled"]
+                failed = reason is not None
+                if reason is None and status["switch"] is None:
+                    code = playback.wait()
+                    if stopped.is_set():
+                        supervisor.finish(playback)
+                        return "done"
+                    reason = end_reason(playback, code)
+                    failed = code != 0 or bool(playback.error)
+            except KeyboardInterrupt:
+                stop_stream(playback, stopped, status)
+                return "stopped"
+            finally:
+                recorded = playback.stop_recording()
+                playback.stop()
+                recording = recorded is not None
+                if recorded:
+                    console.print(f"[green]● Saved {recorded['tracks']} tracks to {escape(recorded['path'])}[/]")
+
+            if status["switch"] is not None:
+                event = controller.events[-1]
+                current = supervisor.current = status["switch"]
+                console.print(f"[cyan]⇅ Switching {event['from']} → {event['to']} kbps ({escape(event['reason'])})[/]")
+                continue
+
+            status["state"] = "stopped"
+            plan = supervisor.next(playback, reason)
+            if plan is None:
+                if supervisor.attempts:
+                    console.print(f"[red]❌ {escape(reason)}; giving up after {supervisor.attempt - 1} attempts.[/]")
+                return "failed" if failed or supervisor.attempts else "done"
+            current, delay = plan
+            console.print(f"[yellow]🔄 {escape(reason)}; reconnecting to {current.get('codec', '')} "
+                          f"{current.get('bitrate', '')} in {delay:.1f}s (attempt {supervisor.attempt}) · "
+                          f"(s) Stop[/]")
+            if not _wait_to_reconnect(delay):
+                return "done"
 
     except KeyboardInterrupt:
-        stop_stream_ffplay(process, stopped, status)
         return "stopped"
+
+    finally:
+        stopped.set()
+        wakeup.close()
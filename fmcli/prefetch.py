@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+import search
+
+NOT_PREFETCHED = object()  # take()'s answer for a page it has no result for; an empty page is a result
+
+
+class Prefetcher:
+    """
+    Loads adjacent result pages in the background while the user reads the
+    current one. At most `max_in_flight` pages are fetched at a time, and
+    cancel() drops everything when the user leaves the search loop.
+    """
+
+    def __init__(self, max_in_flight=config.PREFETCH_MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _in_flight(self):
+        return sum(1 for f in self._futures.values() if not f.done())
+
+    def prefetch(self, query: str, start_index):
+        """Start loading (query, start_index) unless it is already queued or the limit is reached."""
+        if not config.PREFETCH_ENABLED or start_index is None:
+            return
+        key = (query, start_index)
+        with self._lock:
+            if key in self._futures or self._in_flight() >= self.max_in_flight:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                    thread_name_prefix="fmcli-prefetch")
+            self._futures[key] = self._executor.submit(self._fetch, query, start_index)
+
+    @staticmethod
+    def _fetch(query, start_index):
+        # A page that failed to load is not an empty page: raise, so take() leaves it to the caller
+        errors = []
+        result = search.search_stations(query, start_index, quiet=True, on_error=errors.append, fallback=False)
+        if errors:
+            raise errors[0]
+        return result
+
+    def take(self, query: str, start_index):
+        """
+        Return the prefetched (stations, prev_link, next_link) for this page,
+        waiting for it if it is still in flight, or NOT_PREFETCHED if it was
+        never queued or could not be loaded. A page without stations is
+        returned as it is.
+        """
+        with self._lock:
+            future = self._futures.pop((query, start_index), None)
+        if future is None or future.cancelled():
+            return NOT_PREFETCHED
+
+        start = time.perf_counter()
+        try:
+            result = future.result()
+        except Exception:
+            return NOT_PREFETCHED
+        search.last_fetch["mode"] = "prefetch"
+        search.last_fetch["seconds"] = time.perf_counter() - start
+        return result
+
+    def cancel(self):
+        """Forget all prefetched pages and cancel those that have not started yet."""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+    def shutdown(self):
+        self.cancel()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+prefetcher = Prefetcher()
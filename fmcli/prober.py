@@ -0,0 +1,200 @@
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urljoin
+import config
+
+USER_AGENT = "PythonIcyReader/1.0"
+MAX_REDIRECTS = 3
+MAX_HEADER_BYTES = 16 * 1024
+
+# Content types each advertised codec may legitimately be served as.
+CODEC_TYPES = {
+    "mp3": ("audio/mpeg", "audio/mp3", "audio/x-mpeg"),
+    "aac": ("audio/aac", "audio/aacp", "audio/x-aac", "audio/mp4", "audio/x-m4a"),
+    "aac+": ("audio/aac", "audio/aacp", "audio/x-aac", "audio/mp4"),
+    "ogg": ("application/ogg", "audio/ogg", "audio/vorbis"),
+    "opus": ("application/ogg", "audio/ogg", "audio/opus"),
+    "flac": ("audio/flac", "audio/x-flac", "application/ogg", "audio/ogg"),
+}
+
+
+def advertised_kbps(stream):
+    try:
+        return int(stream.get("bitrate", "").replace(" kbps", ""))
+    except ValueError:
+        return None
+
+
+def _read_headers(sock, deadline):
+    """Read the response head. Returns (status_line, headers, leftover body bytes, ttfb timestamp)."""
+    buf = bytearray()
+    first_byte_at = None
+    while b"\r\n\r\n" not in buf and b"\n\n" not in buf:
+        sock.settimeout(max(0.01, deadline - time.perf_counter()))
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        if first_byte_at is None:
+            first_byte_at = time.perf_counter()
+        buf += chunk
+        if len(buf) > MAX_HEADER_BYTES:
+            raise ValueError("response headers too large")
+
+    sep = b"\r\n\r\n" if b"\r\n\r\n" in buf else b"\n\n"
+    head, _, body = bytes(buf).partition(sep)
+    lines = head.decode("latin-1").splitlines()
+    if not lines:
+        raise ValueError("empty response")
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+    return lines[0], headers, body, first_byte_at
+
+
+def _probe_once(url, window, deadline, result):
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+
+    t0 = time.perf_counter()
+    addrinfo = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    t_dns = time.perf_counter()
+    sock = socket.create_connection(addrinfo[0][4][:2], timeout=max(0.01, deadline - t_dns))
+    try:
+        if https:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        t_conn = time.perf_counter()
+
+        request = (f"GET {path} HTTP/1.0\r\nHost: {parts.netloc}\r\nUser-Agent: {USER_AGENT}\r\n"
+                   f"Icy-MetaData: 0\r\nConnection: close\r\n\r\n")
+        sock.sendall(request.encode("latin-1"))
+        t_sent = time.perf_counter()
+        status, headers, body, first_byte_at = _read_headers(sock, deadline)
+
+        result["dns_ms"] = (t_dns - t0) * 1000
+        result["connect_ms"] = (t_conn - t_dns) * 1000
+        result["ttfb_ms"] = ((first_byte_at or time.perf_counter()) - t_sent) * 1000
+
+        code = status.split()[1] if len(status.split()) > 1 else ""
+        if code in ("301", "302", "303", "307", "308") and headers.get("location"):
+            return urljoin(url, headers["location"])
+        if code != "200":
+            raise ValueError(f"unexpected status: {status}")
+
+        result["content_type"] = headers.get("content-type", "").split(";")[0].strip().lower()
+        result["icy_br"] = headers.get("icy-br", "").split(",")[0].strip() or None
+
+        # Sustained throughput over the measurement window
+        received = len(body)
+        start = time.perf_counter()
+        stop_at = min(start + window, deadline)
+        while time.perf_counter() < stop_at:
+            sock.settimeout(max(0.01, stop_at - time.perf_counter()))
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            received += len(chunk)
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        result["kbps"] = received * 8 / 1000 / elapsed
+        result["ok"] = received > 0
+        if not received:
+            result["error"] = "no audio received"
+        return None
+    finally:
+        sock.close()
+
+
+def probe_stream(stream, window=config.PROBE_WINDOW, timeout=config.PROBE_TIMEOUT):
+    """
+    Measure one stream: DNS, connect (incl. TLS) and time-to-first-byte in ms,
+    sustained throughput in kbps over `window` seconds, and whether the
+    reported icy-br and content type agree with what fmstream advertises.
+    The whole probe is bounded by timeout + window.
+    """
+    result = {"url": stream["url"], "ok": False, "error": None, "dns_ms": None, "connect_ms": None,
+              "ttfb_ms": None, "kbps": None, "icy_br": None, "content_type": None,
+              "bitrate_match": None, "codec_match": None}
+    deadline = time.perf_counter() + timeout + window
+    url = stream["url"]
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            url = _probe_once(url, window, deadline, result)
+            if url is None:
+                break
+        else:
+            raise ValueError("too many redirects")
+    except (OSError, ValueError) as e:
+        result["ok"] = False
+        result["error"] = str(e) or type(e).__name__
+
+    advertised = advertised_kbps(stream)
+    if result["icy_br"] and advertised:
+        result["bitrate_match"] = result["icy_br"] == str(advertised)
+    allowed = CODEC_TYPES.get(stream.get("codec", "").lower())
+    if result["content_type"] and allowed:
+        result["codec_match"] = result["content_type"] in allowed
+    return result
+
+
+def probe_streams(streams, window=config.PROBE_WINDOW, timeout=config.PROBE_TIMEOUT,
+                  concurrency=config.PROBE_CONCURRENCY):
+    """Probe all streams concurrently. Returns results in the order of `streams`."""
+    if not streams:
+        return []
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(streams))) as pool:
+        return list(pool.map(lambda s: probe_stream(s, window, timeout), streams))
+
+
+def _sustains(stream, result):
+    advertised = advertised_kbps(stream)
+    return result["ok"] and (not advertised or (result["kbps"] or 0) >= advertised * 0.9)
+
+
+def rank_streams(streams, results, min_bitrate=config.PROBE_MIN_BITRATE):
+    """
+    Indexes of `streams` from best to worst by their probe `results`: working
+    streams that keep up with their advertised bitrate and reach `min_bitrate`
+    (or any that keep up, if none reaches the floor), highest bitrate first,
+    then fastest, preferring streams whose headers agree with what fmstream
+    advertises; then the other streams that answered, fastest first; then the
+    failed ones.
+    """
+    def latency(i):
+        return (results[i]["ttfb_ms"] or 0) + (results[i]["connect_ms"] or 0)
+
+    def mismatched(i):
+        return results[i]["bitrate_match"] is False or results[i]["codec_match"] is False
+
+    def rank(i):
+        # Latency only breaks ties: a few ms of noise must not beat a better bitrate
+        return mismatched(i), -(advertised_kbps(streams[i]) or 0), latency(i)
+
+    working = [i for i, r in enumerate(results) if _sustains(streams[i], r)]
+    acceptable = [i for i in working if (advertised_kbps(streams[i]) or 0) >= min_bitrate] or working
+    answered = [i for i, r in enumerate(results) if r["ok"] and i not in acceptable]
+    failed = [i for i, r in enumerate(results) if not r["ok"]]
+    return (sorted(acceptable, key=rank) + sorted(answered, key=lambda i: (mismatched(i), latency(i)))
+            + failed)
+
+
+def pick_best(streams, results, min_bitrate=config.PROBE_MIN_BITRATE):
+    """
+    Index of the highest-bitrate working stream (the fastest among equals)
+    whose advertised bitrate is at least `min_bitrate` and whose measured
+    throughput keeps up with it, or None. Falls back to any working stream if
+    none reaches the bitrate floor, and prefers streams whose headers agree
+    with what fmstream advertises.
+    """
+    ranked = rank_streams(streams, results, min_bitrate)
+    if ranked and _sustains(streams[ranked[0]], results[ranked[0]]):
+        return ranked[0]
+    return None
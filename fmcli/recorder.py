@@ -0,0 +1,213 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from appdirs import user_data_dir
+import config
+
+# Content-Type of the stream -> (extension, CUE file type)
+_CONTENT_TYPES = {
+    "audio/mpeg": ("mp3", "MP3"), "audio/mp3": ("mp3", "MP3"), "audio/x-mpeg": ("mp3", "MP3"),
+    "audio/mpeg3": ("mp3", "MP3"),
+    "audio/aac": ("aac", "WAVE"), "audio/aacp": ("aac", "WAVE"), "audio/x-aac": ("aac", "WAVE"),
+    "audio/mp4": ("m4a", "WAVE"), "audio/x-m4a": ("m4a", "WAVE"),
+    "application/ogg": ("ogg", "WAVE"), "audio/ogg": ("ogg", "WAVE"), "audio/vorbis": ("ogg", "WAVE"),
+    "audio/opus": ("opus", "WAVE"),
+    "audio/flac": ("flac", "WAVE"), "audio/x-flac": ("flac", "WAVE"),
+}
+
+# (magic prefix, extension, CUE file type) for sniffing the stream's container when it has no known
+# Content-Type. Only reliable at a frame boundary, which a recording started mid-stream rarely is.
+_FORMATS = (
+    (b"OggS", "ogg", "WAVE"),
+    (b"fLaC", "flac", "WAVE"),
+    (b"ID3", "mp3", "MP3"),
+    (b"\xff\xf1", "aac", "WAVE"),
+    (b"\xff\xf9", "aac", "WAVE"),
+)
+_UNSAFE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def default_directory():
+    return config.RECORD_DIR or os.path.join(user_data_dir("fmcli"), "recordings")
+
+
+def _safe_name(text, limit=80):
+    return _UNSAFE.sub("_", text).strip(" .")[:limit] or "Unknown"
+
+
+def _format_for(content_type, head):
+    """(extension, CUE file type) from the Content-Type header, or sniffed from the first bytes."""
+    mime = (content_type or "").split(";")[0].strip().lower()
+    return _CONTENT_TYPES.get(mime) or _sniff(head)
+
+
+def _sniff(head):
+    for magic, ext, cue_type in _FORMATS:
+        if head.startswith(magic):
+            return ext, cue_type
+    return "mp3", "MP3"  # MPEG frame sync, or unknown: Icecast's most common format
+
+
+class Recorder:
+    """
+    Writes demuxed audio to disk, one file per StreamTitle.
+
+    The file extension and CUE file type follow `content_type` (the stream's
+    Content-Type header, which the demuxer fills in when it attaches the
+    recorder); only without one is the format sniffed from the audio.
+
+    write() and split() are called from the stream's reader thread, in stream
+    order, and only append to an in-memory batch; a writer thread does the
+    disk I/O in FMCLI_RECORD_WRITE_KB writes. At most FMCLI_RECORD_BUFFER_MB
+    may wait for the disk: beyond that audio is dropped (and counted) rather
+    than stalling playback. Every split rewrites index.json and tracks.cue in
+    the session directory.
+    """
+
+    def __init__(self, name, url=None, directory=None, write_size=config.RECORD_WRITE_KB * 1024,
+                 max_buffered=config.RECORD_BUFFER_MB * 1024 * 1024, content_type=None):
+        self.name = name
+        self.url = url
+        self.content_type = content_type
+        stamp = time.strftime("%Y-%m-%d %H%M%S")
+        self.path = os.path.join(directory or default_directory(), f"{_safe_name(name)} {stamp}")
+        self.write_size = write_size
+        self.max_buffered = max_buffered
+        self.bytes_written = 0
+        self.dropped_bytes = 0
+        self.tracks = []
+        self.started = time.time()
+        self._started_at = time.monotonic()
+        self._batch = bytearray()
+        self._titled = False
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._queued_bytes = 0
+        self._closed = False
+        self._format = None
+        self._file = None
+        self._title = name
+        self._offset = 0.0
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name="fmcli-recorder", daemon=True)
+        self._thread.start()
+
+    # --- reader thread ---
+
+    def write(self, data):
+        self._batch += data
+        if len(self._batch) >= self.write_size:
+            self._enqueue(("data", bytes(self._batch)))
+            self._batch.clear()
+
+    def flush(self):
+        if self._batch:
+            self._enqueue(("data", bytes(self._batch)))
+            self._batch.clear()
+
+    def split(self, title):
+        """Start a new file for `title`; audio written after this call goes into it."""
+        offset = time.monotonic() - self._started_at
+        if self._titled:
+            self.flush()
+        # The audio before the very first title is the same song: it opens that title's file
+        self._titled = True
+        self._enqueue(("split", title, offset))
+
+    def close(self):
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _enqueue(self, item):
+        with self._cond:
+            if item[0] == "data":
+                if self._queued_bytes + len(item[1]) > self.max_buffered:
+                    self.dropped_bytes += len(item[1])  # the disk is not keeping up
+                    return
+                self._queued_bytes += len(item[1])
+            self._queue.append(item)
+            self._cond.notify()
+
+    # --- writer thread ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    break
+                item = self._queue.popleft()
+                if item[0] == "data":
+                    self._queued_bytes -= len(item[1])
+
+            try:
+                if item[0] == "split":
+                    self._close_file()
+                    self._title = item[1]
+                    self._offset = item[2]
+                elif self.error is None:
+                    if self._file is None:
+                        self._open_file(item[1])
+                    self._file.write(item[1])
+                    self.bytes_written += len(item[1])
+                    self.tracks[-1]["bytes"] += len(item[1])
+                else:
+                    self.dropped_bytes += len(item[1])
+            except OSError as e:
+                self.error = str(e)  # e.g. disk full; playback carries on without the recording
+        try:
+            self._close_file()
+        except OSError as e:
+            self.error = str(e)
+
+    def _open_file(self, head):
+        if self._format is None:
+            self._format = _format_for(self.content_type, head)
+        number = len(self.tracks) + 1
+        filename = f"{number:03d} - {_safe_name(self._title)}.{self._format[0]}"
+        os.makedirs(self.path, exist_ok=True)
+        self._file = open(os.path.join(self.path, filename), "wb", buffering=0)
+        self.tracks.append({"number": number, "title": self._title, "file": filename,
+                            "offset": round(self._offset, 2), "bytes": 0})
+        self._write_index()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._write_index()
+
+    def _write_index(self):
+        index = {"station": self.name, "url": self.url,
+                 "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                 "bytes": self.bytes_written, "dropped_bytes": self.dropped_bytes, "error": self.error,
+                 "tracks": self.tracks}
+        self._replace("index.json", json.dumps(index, ensure_ascii=False, indent=2))
+
+        cue_type = self._format[1] if self._format else "MP3"
+
+        def quoted(text):
+            return '"' + text.replace('"', "'") + '"'
+
+        lines = [f"PERFORMER {quoted(self.name)}", f"TITLE {quoted(self.name + ' ' + index['started'])}"]
+        for track in self.tracks:
+            lines += [f"FILE {quoted(track['file'])} {cue_type}", f"  TRACK {track['number']:02d} AUDIO",
+                      f"    TITLE {quoted(track['title'])}", "    INDEX 01 00:00:00"]
+        self._replace("tracks.cue", "\n".join(lines) + "\n")
+
+    def _replace(self, filename, text):
+        path = os.path.join(self.path, filename)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(path + ".tmp", path)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "tracks": len(self.tracks), "bytes": self.bytes_written,
+                "dropped_bytes": self.dropped_bytes, "error": self.error}
@@ -1,69 +1,211 @@
-from requests_html import HTMLSession
-from bs4 import BeautifulSoup
+import time
+import threading
+import requests
+import tracing
+import transport
 from rich.table import Table
 from console_manager import console
 from utils import clear_console
-import re
+from browser import browser_pool
+from cache import search_cache
+from station_index import station_index
+from prober import pick_best
+from station_parser import parse_document, has_station_blocks, iter_stations, parse_pagination
+import config
 
 BASE_URL = "https://fmstream.org/index.php?s="
+STATIC_HEADERS = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) fmcli"}
 
-def search_stations(query: str, start_index=0):
+# Markers of the shell page served before the station list is filled in by JavaScript.
+PLACEHOLDER_MARKERS = ("enable javascript", "id=\"loading\"", "class=\"loading\"")
+
+# How the last search page was obtained: "cache", "stale cache", "static", "render" or "static→render".
+last_fetch = {"mode": None, "seconds": 0.0}
+
+
+def _has_station_blocks(html: str) -> bool:
+    """True if the raw page already contains parseable station blocks."""
+    lowered = html.lower()
+    if not lowered.strip() or any(marker in lowered for marker in PLACEHOLDER_MARKERS):
+        return False
+    return has_station_blocks(parse_document(html))
+
+
+def _record_fetch(mode, start):
+    last_fetch["mode"] = mode
+    last_fetch["seconds"] = time.perf_counter() - start
+
+
+def fetch_page(url: str):
+    """
+    Fetch a results page, preferring a plain GET and falling back to a
+    JavaScript render only when the static page has no station blocks (or
+    the server answered with an error page). Transport errors such as DNS
+    failures and refused connections are raised: a browser would fail the
+    same way, only 20 s later.
+    Returns (html, mode) where mode says which path produced the page.
+    """
+    mode = config.SEARCH_MODE
+    html = None
+
+    if mode in ("auto", "static"):
+        try:
+            with tracing.span("search.http_get", url=url):
+                resp = transport.get(url, headers=STATIC_HEADERS,
+                                     timeout=(config.HTTP_CONNECT_TIMEOUT, config.STATIC_TIMEOUT))
+                resp.raise_for_status()
+                text = resp.text
+            if mode == "static":
+                html = text
+            else:
+                with tracing.span("search.detect_blocks"):
+                    if _has_station_blocks(text):
+                        html = text
+        except requests.exceptions.HTTPError:
+            if mode == "static":
+                raise
+        mode = "static" if html is not None else "static→render"
+
+    if html is None:
+        with tracing.span("search.render", url=url):
+            html = browser_pool.render(url)
+
+    return html, mode
+
+
+_revalidating = set()
+
+
+def _revalidate(query: str, start_index):
+    """Refresh a stale cache entry in the background, once per key."""
+    key = (query, start_index)
+    if key in _revalidating:
+        return
+    _revalidating.add(key)
+
+    def worker():
+        try:
+            _search_live(query, start_index, quiet=True, fallback=False)
+        finally:
+            _revalidating.discard(key)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+
+def search_stations(query: str, start_index=0, quiet=False, on_error=None, fallback=True):
     """
     Search FMStream stations by query and return:
     - List of stations with name, location, genre, description, and streams
     - Previous page index (or None)
     - Next page index (or None)
+    Pages are served from the on-disk cache when possible. With quiet=True
+    (background callers) nothing is printed and `last_fetch` is left alone.
+    When the page cannot be fetched, `on_error` receives the exception and
+    the first page is answered from the local index instead, unless
+    fallback=False (refreshers that must not mistake the index for the site).
     """
-    session = HTMLSession()
+    return _collect(iter_search(query, start_index, quiet, on_error, fallback))
+
+
+def iter_search(query: str, start_index=0, quiet=False, on_error=None, fallback=True):
+    """
+    Generator form of search_stations: yields each station as soon as it is
+    parsed, and returns (prev_link, next_link) when the page is done, so
+    `prev_link, next_link = yield from iter_search(...)` works.
+    """
+    start = time.perf_counter()
+    if config.CACHE_ENABLED:
+        with tracing.span("search.cache_get"):
+            cached = search_cache.get(query, start_index)
+        if cached is not None:
+            (stations, prev_link, next_link), fresh = cached
+            if fresh or config.CACHE_STALE_WHILE_REVALIDATE:
+                if not fresh:
+                    _revalidate(query, start_index)
+                if not quiet:
+                    _record_fetch("cache" if fresh else "stale cache", start)
+                yield from stations
+                return prev_link, next_link
+
+    return (yield from _iter_live(query, start_index, quiet, on_error, fallback))
+
+
+def _collect(pages):
+    """Drain an iter_search generator into (stations, prev_link, next_link)."""
+    stations = []
+    while True:
+        try:
+            stations.append(next(pages))
+        except StopIteration as done:
+            prev_link, next_link = done.value
+            return stations, prev_link, next_link
+
+
+def _search_live(query: str, start_index=0, quiet=False, on_error=None, fallback=True):
+    """Fetch and parse a results page from fmstream.org, storing it in the cache."""
+    return _collect(_iter_live(query, start_index, quiet, on_error, fallback))
+
+
+def _iter_live(query: str, start_index=0, quiet=False, on_error=None, fallback=True):
+    start = time.perf_counter()
     try:
         url = f"{BASE_URL}{query}&n={start_index}"
-        resp = session.get(url)
-        resp.html.render(timeout=20)
+        html, mode = fetch_page(url)
     except Exception as e:
-        console.print(f"[red]❌ Failed to render page:[/] {e}")
-        return [], None, None
+        if on_error is not None:
+            on_error(e)
+        if not quiet:
+            console.print(f"[red]❌ Failed to load page:[/] {e}")
+        # fmstream.org unreachable: answer the first page from the local index instead
+        if fallback and config.INDEX_ENABLED and start_index == 0:
+            stations = station_index.search(query)
+            if stations:
+                if not quiet:
+                    _record_fetch("local index (offline)", start)
+                yield from stations
+        return None, None
 
-    soup = BeautifulSoup(resp.html.html, "html.parser")
+    if not html.strip():
+        return None, None
+    with tracing.span("search.parse_document", bytes=len(html)):
+        tree = parse_document(html)
     stations = []
+    # Stations are yielded as they are parsed, so only the time spent parsing is added up
+    parse_start = time.perf_counter()
+    parsing = 0.0
+    stations_iter = iter_stations(tree)
+    while True:
+        resumed = time.perf_counter()
+        station = next(stations_iter, None)
+        parsing += time.perf_counter() - resumed
+        if station is None:
+            break
+        stations.append(station)
+        yield station
+    tracing.add("search.parse_stations", parse_start, parse_start + parsing, stations=len(stations))
+    prev_link, next_link = parse_pagination(tree)
+
+    with tracing.span("search.store"):
+        if stations and config.CACHE_ENABLED:
+            search_cache.put(query, start_index, stations, prev_link, next_link)
+        if stations and config.INDEX_ENABLED:
+            station_index.add_stations(stations, query if start_index == 0 else None)
+    if not quiet:
+        _record_fetch(mode, start)
+
+    return prev_link, next_link
+
 
-    for block in soup.select("div.stnblock"):
-        name = block.select_one("h3.stn").text.strip() if block.select_one("h3.stn") else "Unknown Station"
-        location = block.select_one(".loc").text.strip() if block.select_one(".loc") else "Unknown Location"
-        genre = block.select_one(".sty").text.strip() if block.select_one(".sty") else "Unknown Genre"
-        desc = block.select_one(".desc").text.strip() if block.select_one(".desc") else ""
-
-        streams = []
-        for sq in block.select(".sqdiv .sq"):
-            url = sq.get("title")
-            codec = sq.select_one(".cn").text.strip() if sq.select_one(".cn") else "Unknown"
-            bitrate = sq.select_one(".br").text.strip() + " kbps" if sq.select_one(".br") else "Unknown"
-            if url:
-                streams.append({"url": url, "codec": codec, "bitrate": bitrate})
-
-        if streams:
-            stations.append({
-                "name": name,
-                "location": location,
-                "genre": genre,
-                "description": desc,
-                "streams": streams
-            })
-
-    # Pagination
-    prev_link = None
-    next_link = None
-    footer = soup.select_one("footer#footer")
-    if footer:
-        prev_tag = footer.select_one('a.btn.arrbtn:contains("←")')
-        next_tag = footer.select_one('a.btn.arrbtn:contains("→")')
-        if prev_tag and "n=" in prev_tag.get("href", ""):
-            prev_link = int(re.search(r"n=(\d+)", prev_tag["href"]).group(1))
-        if next_tag and "n=" in next_tag.get("href", ""):
-            next_link = int(re.search(r"n=(\d+)", next_tag["href"]).group(1))
-
-    return stations, prev_link, next_link
+@tracing.traced("search.local")
+def search_local(query: str):
+    """Search the local station index only. Returns the same triple as search_stations."""
+    start = time.perf_counter()
+    stations = station_index.search(query)
+    _record_fetch("local index", start)
+    return stations, None, None
 
 
+@tracing.traced("render.station_list")
 def show_station_list(stations):
     clear_console()
     table = Table(title="FMStream Search Results", show_header=True, header_style="bold magenta")
@@ -75,10 +217,39 @@ def show_station_list(stations):
     for i, st in enumerate(stations, 1):
         table.add_row(str(i), st["name"], st["genre"], st["location"])
 
+    if last_fetch["mode"]:
+        table.caption = f"fetched via {last_fetch['mode']} in {last_fetch['seconds']:.2f}s"
+        if config.CACHE_ENABLED:
+            stats = search_cache.stats()
+            table.caption += f" · cache {stats['hits']} hit / {stats['stale_hits']} stale / {stats['misses']} miss"
+        http = transport.stats()
+        if http["requests"]:
+            table.caption += f" · http {http['opened']} opened / {http['reused']} reused"
+
     console.print(table)
 
 
-def show_streams(station):
+def _probe_cells(result, stream):
+    """TTFB, throughput and header-check cells for one probe result."""
+    if not result["ok"]:
+        return "—", "—", f"[red]✗ {result['error'] or 'failed'}[/]"
+    checks = []
+    if result["bitrate_match"] is False:
+        checks.append(f"icy-br {result['icy_br']}")
+    if result["codec_match"] is False:
+        checks.append(result["content_type"])
+    check = "[yellow]≠ " + ", ".join(checks) + "[/]" if checks else "[green]✓[/]"
+    return f"{result['ttfb_ms']:.0f} ms", f"{result['kbps']:.0f} kbps", check
+
+
+@tracing.traced("render.streams")
+def show_streams(station, probes=None):
+    """
+    Print the station's streams sorted by bitrate and return (sorted_streams, best)
+    so the caller can map the numbers shown back to streams. When probe results
+    (a dict keyed by URL) are given, their measurements are added and `best` is
+    the index of the stream pick_best recommends; otherwise it is None.
+    """
     clear_console()
     # Sort streams by bitrate ascending
     def parse_bitrate(b):
@@ -88,14 +259,26 @@ def show_streams(station):
             return 0  # Unknown bitrate goes first
 
     sorted_streams = sorted(station["streams"], key=parse_bitrate)
+    best = None
+    if probes:
+        best = pick_best(sorted_streams, [probes[s["url"]] for s in sorted_streams])
 
     table = Table(title=f"Streams for {station['name']}", header_style="bold blue")
     table.add_column("No.", justify="center", width=4)
     table.add_column("Codec", style="cyan", width=10)
     table.add_column("Bitrate", style="yellow", width=10)
+    if probes:
+        table.add_column("TTFB", justify="right")
+        table.add_column("Measured", justify="right")
+        table.add_column("Check")
     table.add_column("Stream URL", style="bold white")
 
     for i, s in enumerate(sorted_streams, 1):
-        table.add_row(str(i), s["codec"], s["bitrate"], s["url"])
+        number = f"★{i}" if best == i - 1 else str(i)
+        if probes:
+            table.add_row(number, s["codec"], s["bitrate"], *_probe_cells(probes[s["url"]], s), s["url"])
+        else:
+            table.add_row(number, s["codec"], s["bitrate"], s["url"])
 
     console.print(table)
+    return sorted_streams, best
@@ -0,0 +1,62 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from rich.table import Table
+from console_manager import console
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Imports the menu and draws it once, then exits.
+MENU_SNIPPET = "import main; main.show_menu()"
+
+
+def import_profile(snippet=MENU_SNIPPET):
+    """
+    Run `snippet` in a fresh interpreter under -X importtime and return
+    [(module, self_us, cumulative_us, depth)] in import order.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", snippet],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def time_to_menu(runs=5):
+    """Median wall time, in seconds, from interpreter launch until the menu has been drawn."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", MENU_SNIPPET], cwd=HERE,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def print_startup_profile(limit=25):
+    """Print the slowest imports on the way to the menu and the measured time-to-menu."""
+    entries = import_profile()
+    total_us = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+
+    table = Table(title="Startup import profile", header_style="bold magenta")
+    table.add_column("Module", style="cyan")
+    table.add_column("Self", justify="right")
+    table.add_column("Cumulative", justify="right", style="yellow")
+    table.add_column("Share", justify="right")
+
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda e: -e[2])[:limit]:
+        table.add_row("  " * depth + name, f"{self_us / 1000:.1f} ms", f"{cumulative_us / 1000:.1f} ms",
+                      f"{cumulative_us / total_us:.0%}" if total_us else "")
+
+    console.print(table)
+    console.print(f"[bold]Imports:[/] {total_us / 1000:.0f} ms across {len(entries)} modules")
+    console.print(f"[bold]Time to menu:[/] {time_to_menu() * 1000:.0f} ms (median of 5 launches)")
@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from appdirs import user_data_dir
+import config
+import tracing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    genre TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    seen REAL NOT NULL,
+    UNIQUE (name, location)
+);
+CREATE TABLE IF NOT EXISTS streams (
+    station_id INTEGER NOT NULL REFERENCES stations(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    bitrate TEXT NOT NULL,
+    PRIMARY KEY (station_id, url)
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    refreshed REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS stations_fts USING fts5(
+    name, genre, location, description,
+    content='stations', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS stations_ai AFTER INSERT ON stations BEGIN
+    INSERT INTO stations_fts(rowid, name, genre, location, description)
+    VALUES (new.id, new.name, new.genre, new.location, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS stations_ad AFTER DELETE ON stations BEGIN
+    INSERT INTO stations_fts(stations_fts, rowid, name, genre, location, description)
+    VALUES ('delete', old.id, old.name, old.genre, old.location, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS stations_au AFTER UPDATE ON stations BEGIN
+    INSERT INTO stations_fts(stations_fts, rowid, name, genre, location, description)
+    VALUES ('delete', old.id, old.name, old.genre, old.location, old.description);
+    INSERT INTO stations_fts(rowid, name, genre, location, description)
+    VALUES (new.id, new.name, new.genre, new.location, new.description);
+END;
+"""
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, as a prefix."""
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words)
+
+
+class StationIndex:
+    """
+    Local full-text index of every station the CLI has seen.
+
+    Stations are kept in a plain table with their streams normalized into a
+    second one; an external-content FTS5 table over name, genre, location and
+    description answers searches without touching the network.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_data_dir("fmcli"), "stations.sqlite3")
+        self._lock = threading.Lock()
+        self._db = None
+        self._refresh_thread = None
+
+    def _conn(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA foreign_keys = ON")
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.executescript(SCHEMA)
+        return self._db
+
+    def add_stations(self, stations, query=None):
+        """Insert or update stations (and replace their streams). Optionally remember the query for refresh."""
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            with db:
+                for st in stations:
+                    db.execute(
+                        "INSERT INTO stations (name, location, genre, description, seen) VALUES (?, ?, ?, ?, ?)"
+                        " ON CONFLICT (name, location) DO UPDATE SET"
+                        " genre = excluded.genre, description = excluded.description, seen = excluded.seen",
+                        (st["name"], st.get("location", ""), st.get("genre", ""), st.get("description", ""), now),
+                    )
+                    station_id = db.execute(
+                        "SELECT id FROM stations WHERE name = ? AND location = ?",
+                        (st["name"], st.get("location", "")),
+                    ).fetchone()[0]
+                    db.execute("DELETE FROM streams WHERE station_id = ?", (station_id,))
+                    db.executemany(
+                        "INSERT OR IGNORE INTO streams (station_id, position, url, codec, bitrate) VALUES (?, ?, ?, ?, ?)",
+                        [(station_id, i, s["url"], s.get("codec", "Unknown"), s.get("bitrate", "Unknown"))
+                         for i, s in enumerate(st.get("streams", []))],
+                    )
+                if query:
+                    db.execute("INSERT OR REPLACE INTO queries (query, refreshed) VALUES (?, ?)",
+                               (query.strip().lower(), now))
+
+    @tracing.traced("index.search")
+    def search(self, text: str, limit=50):
+        """Return stations matching text, best match first, in search_stations' format."""
+        match = _fts_query(text)
+        if not match:
+            return []
+        with self._lock:
+            db = self._conn()
+            rows = db.execute(
+                "SELECT s.id, s.name, s.location, s.genre, s.description FROM stations_fts"
+                " JOIN stations s ON s.id = stations_fts.rowid"
+                " WHERE stations_fts MATCH ? ORDER BY bm25(stations_fts, 10.0, 2.0, 4.0, 1.0) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+            results = []
+            for station_id, name, location, genre, description in rows:
+                streams = db.execute(
+                    "SELECT url, codec, bitrate FROM streams WHERE station_id = ? ORDER BY position",
+                    (station_id,),
+                ).fetchall()
+                if streams:
+                    results.append({
+                        "name": name,
+                        "location": location,
+                        "genre": genre,
+                        "description": description,
+                        "streams": [{"url": u, "codec": c, "bitrate": b} for u, c, b in streams],
+                    })
+        return results
+
+    def import_file(self, path) -> int:
+        """Bulk-load stations from a JSON list or JSON-lines file. Returns the number imported."""
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        stripped = text.lstrip()
+        if stripped.startswith("["):
+            stations = json.loads(text)
+        else:
+            stations = [json.loads(line) for line in text.splitlines() if line.strip()]
+        stations = [st for st in stations if st.get("name") and st.get("streams")]
+        self.add_stations(stations)
+        return len(stations)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn().execute("SELECT COUNT(*) FROM stations").fetchone()[0]
+
+    def stale_queries(self, max_age, limit):
+        with self._lock:
+            return [q for (q,) in self._conn().execute(
+                "SELECT query FROM queries WHERE refreshed < ? ORDER BY refreshed LIMIT ?",
+                (time.time() - max_age, limit),
+            )]
+
+    def refresh(self, max_age=config.INDEX_REFRESH_AGE, limit=config.INDEX_REFRESH_BATCH):
+        """Re-run the oldest remembered queries against fmstream.org to update the index."""
+        import search  # search feeds this index, so import it lazily
+
+        for query in self.stale_queries(max_age, limit):
+            search._search_live(query, 0, quiet=True, fallback=False)
+
+    def start_background_refresh(self):
+        """Refresh stale queries on a daemon thread, at most once per process."""
+        if not config.INDEX_ENABLED or self._refresh_thread is not None:
+            return
+        self._refresh_thread = threading.Thread(target=self.refresh, name="fmcli-index-refresh", daemon=True)
+        self._refresh_thread.start()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+station_index = StationIndex()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the local FMStream station index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="bulk-import stations from JSON / JSON lines").add_argument("file")
+    sub.add_parser("search", help="query the index").add_argument("text")
+    sub.add_parser("refresh", help="refresh stale queries from fmstream.org")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"Imported {station_index.import_file(args.file)} stations ({station_index.count()} indexed).")
+    elif args.command == "search":
+        for st in station_index.search(args.text):
+            print(json.dumps(st, ensure_ascii=False))
+    elif args.command == "refresh":
+        station_index.refresh()
@@ -0,0 +1,111 @@
+import re
+import lxml.html
+from lxml import etree
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Compiled once; each call runs in libxml2 rather than soupsieve.
+_STATION_BLOCKS = etree.XPath(f"//div[{_has_class('stnblock')}]")
+_ARROW_LINKS = etree.XPath(f"//footer[@id='footer']//a[{_has_class('btn')} and {_has_class('arrbtn')}]")
+_PAGE_INDEX = re.compile(r"n=(\d+)")
+
+# Fields taken from the first matching descendant of a station block.
+_FIELDS = {"stn": "name", "loc": "location", "sty": "genre", "desc": "description"}
+_DEFAULTS = {"name": "Unknown Station", "location": "Unknown Location", "genre": "Unknown Genre", "description": ""}
+
+
+def _classes(el):
+    value = el.get("class")
+    return value.split() if value else ()
+
+
+def _parse_stream(sq):
+    url = sq.get("title")
+    codec = bitrate = None
+    for el in sq.iterdescendants():
+        for cls in _classes(el):
+            if cls == "cn" and codec is None:
+                codec = el.text_content().strip()
+            elif cls == "br" and bitrate is None:
+                bitrate = el.text_content().strip() + " kbps"
+    return {"url": url, "codec": codec or "Unknown", "bitrate": bitrate or "Unknown"}
+
+
+def _parse_block(block):
+    """Walk one stnblock a single time, picking up every field as it is reached."""
+    station = {}
+    streams = []
+    sqdivs = set()
+
+    for el in block.iterdescendants():
+        if not isinstance(el.tag, str):
+            continue  # comments / processing instructions
+        for cls in _classes(el):
+            key = _FIELDS.get(cls)
+            if key and key not in station and (key != "name" or el.tag == "h3"):
+                station[key] = el.text_content().strip()
+            elif cls == "sqdiv":
+                sqdivs.add(el)
+            elif cls == "sq" and el.get("title") and any(a in sqdivs for a in el.iterancestors()):
+                streams.append(_parse_stream(el))
+
+    if not streams:
+        return None
+    return {
+        "name": station.get("name", _DEFAULTS["name"]),
+        "location": station.get("location", _DEFAULTS["location"]),
+        "genre": station.get("genre", _DEFAULTS["genre"]),
+        "description": station.get("description", _DEFAULTS["description"]),
+        "streams": streams,
+    }
+
+
+def parse_document(html: str):
+    return lxml.html.document_fromstring(html)
+
+
+def has_station_blocks(tree) -> bool:
+    return bool(_STATION_BLOCKS(tree))
+
+
+def iter_stations(tree):
+    """Yield station dicts in page order; blocks without playable streams are skipped."""
+    for block in _STATION_BLOCKS(tree):
+        station = _parse_block(block)
+        if station is not None:
+            yield station
+
+
+def _page_index(link):
+    if link is None:
+        return None
+    match = _PAGE_INDEX.search(link.get("href", ""))
+    return int(match.group(1)) if match else None
+
+
+def parse_pagination(tree):
+    """Return (prev_link, next_link) page offsets from the footer arrows."""
+    prev_tag = next_tag = None
+    for a in _ARROW_LINKS(tree):
+        text = a.text_content()
+        if prev_tag is None and "←" in text:
+            prev_tag = a
+        if next_tag is None and "→" in text:
+            next_tag = a
+    return _page_index(prev_tag), _page_index(next_tag)
+
+
+def parse_results(html: str):
+    """
+    Parse an fmstream.org results page into the same structure as
+    search_stations: (stations, prev_link, next_link).
+    """
+    if not html or not html.strip():
+        return [], None, None
+    tree = parse_document(html)
+    stations = list(iter_stations(tree))
+    prev_link, next_link = parse_pagination(tree)
+    return stations, prev_link, next_link
@@ -0,0 +1,143 @@
+import random
+import select
+import time
+import config
+from prober import probe_streams, rank_streams
+
+
+def backoff_delay(attempt, base=config.RECONNECT_BASE, cap=config.RECONNECT_MAX):
+    """Seconds to wait before reconnect `attempt` (1-based): doubling up to `cap`, half of it jittered."""
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def end_reason(playback, code):
+    """Why a playback that was not stopped by the user ended."""
+    if playback.error:
+        return playback.error
+    return f"player exited with code {code}" if code else "stream ended"
+
+
+def watch(playback, stall_timeout=config.STALL_SECONDS, stopped=None, check=None):
+    """
+    Block until `playback` ends or stalls, handling its output meanwhile.
+    Returns why it ended (see end_reason and Playback.stalled), or None once
+    `stopped` is set or `check()`, called about once a second, returns True.
+    For headless use; the player view does the same in its own loop.
+    """
+    fd = playback.fileno()
+    interval = min(1.0, stall_timeout / 4) if stall_timeout else 1.0
+    while stopped is None or not stopped.is_set():
+        code = playback.poll()
+        if code is not None:
+            return end_reason(playback, code)
+        reason = playback.stalled(stall_timeout) if stall_timeout else None
+        if reason:
+            return reason
+        if check is not None and check():
+            return None
+        if fd is None:
+            time.sleep(interval)
+        elif select.select([fd], [], [], interval)[0] and not playback.on_readable():
+            return end_reason(playback, playback.wait())  # EOF on ffplay's log: it is exiting
+    return None
+
+
+class Supervisor:
+    """
+    Decides how to get a station playing again after its stream ended,
+    failed or stalled without the user stopping it.
+
+    The stream that dropped is retried first (most drops are a network blip),
+    then the station's other streams, best first by probe results; streams
+    without results are probed on the first failover. Delays grow
+    exponentially with jitter and reset once a stream has played for
+    `reset_after` seconds. After `attempts` drops in a row it gives up, and
+    before anything has played it tries each stream only once.
+
+    Every drop is recorded in `events` (and passed to `on_event`) as
+    {"type": "reconnect", "reason", "url", "attempt", "delay", "failover",
+    "played"}; stats() sums them up.
+    """
+
+    def __init__(self, stream, alternates=(), probes=None, attempts=config.RECONNECT_ATTEMPTS,
+                 reset_after=config.RECONNECT_RESET, on_event=None):
+        self.current = stream
+        self.attempts = attempts
+        self.reset_after = reset_after
+        self.on_event = on_event or (lambda event: None)
+        self.attempt = 0  # drops in a row
+        self.events = []
+        self.failovers = 0
+        self.downtime = 0.0
+        self._streams = [stream] + [s for s in alternates if s["url"] != stream["url"]]
+        self._probes = dict(probes or {})
+        self._ranked = len(self._streams) < 3
+        self._down_since = None
+        self._played = False
+        self._dropped_url = stream["url"]  # the stream that started the current run of drops
+
+    def _rank_alternates(self):
+        """Order the streams other than the first by measured quality, probing those not measured yet."""
+        alternates = self._streams[1:]
+        missing = [s for s in alternates if s["url"] not in self._probes]
+        if missing:
+            self._probes.update((r["url"], r) for r in probe_streams(missing))
+        order = rank_streams(alternates, [self._probes[s["url"]] for s in alternates])
+        self._streams[1:] = [alternates[i] for i in order]
+        self._ranked = True
+
+    def _account(self, playback):
+        """Book the downtime that ended with this playback's first audio."""
+        if playback.first_audio_at is not None and self._down_since is not None:
+            self.downtime += max(0.0, playback.first_audio_at - self._down_since)
+            self._down_since = None
+
+    def next(self, playback, reason):
+        """
+        `playback` of the current stream dropped for `reason`. Returns
+        (stream, delay) for the next attempt, or None to give up.
+        """
+        now = time.perf_counter()
+        self._account(playback)
+        played = now - playback.first_audio_at if playback.first_audio_at is not None else 0.0
+        self._played = self._played or playback.first_audio_at is not None
+        if played >= self.reset_after:
+            self.attempt = 0
+        if self._down_since is None:
+            self._down_since = now
+        self.attempt += 1
+        if self.attempt == 1:
+            self._dropped_url = self.current["url"]
+
+        event = {"type": "reconnect", "reason": reason, "url": None, "attempt": self.attempt, "delay": None,
+                 "failover": False, "played": round(played, 1)}
+        limit = self.attempts if self._played else min(self.attempts, len(self._streams))
+        if self.attempt > limit:
+            event["type"] = "gave_up"
+            self.events.append(event)
+            self.on_event(event)
+            return None
+
+        if self.attempt > 1 and not self._ranked:
+            self._rank_alternates()
+        # First retry the same stream, then walk the others starting after it
+        start = next(i for i, s in enumerate(self._streams) if s["url"] == self._dropped_url)
+        stream = self._streams[(start + self.attempt - 1) % len(self._streams)]
+        delay = backoff_delay(self.attempt)
+
+        event.update(url=stream["url"], delay=round(delay, 2), failover=stream["url"] != self.current["url"])
+        self.failovers += event["failover"]
+        self.current = stream
+        self.events.append(event)
+        self.on_event(event)
+        return stream, delay
+
+    def finish(self, playback):
+        """The user stopped `playback`; count any downtime it ended."""
+        self._account(playback)
+
+    def stats(self) -> dict:
+        drops = [e for e in self.events if e["type"] == "reconnect"]
+        return {"reconnects": len(drops), "failovers": self.failovers, "downtime": round(self.downtime, 1),
+                "last_reason": self.events[-1]["reason"] if self.events else None}
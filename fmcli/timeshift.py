@@ -0,0 +1,107 @@
+import mmap
+import threading
+import config
+
+
+def capacity_for(kbps, minutes=config.TIMESHIFT_MINUTES):
+    """Bytes needed to hold `minutes` of audio at `kbps`."""
+    return max(64 * 1024, int(minutes * 60 * kbps * 1000 / 8))
+
+
+class TimeshiftBuffer:
+    """
+    Fixed-size ring buffer between the network reader and the player.
+
+    The reader side (the connection) never blocks: write() always succeeds and,
+    once the buffer is full, overwrites the oldest audio and moves a lagging
+    player forward. The player side blocks in read() while paused or empty, so
+    a pause only stops playback, not the connection, and resume continues from
+    the pause point. Memory is one anonymous mmap of `capacity` bytes.
+
+    Implements write/flush/close so it can be handed to IcyDemuxer as its sink.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.dropped = 0
+        self._map = mmap.mmap(-1, capacity)
+        self._cond = threading.Condition()
+        self._written = 0  # absolute stream positions
+        self._read = 0
+        self._paused = False
+        self._closed = False
+        self._aborted = False
+
+    # --- writer side ---
+
+    def write(self, data):
+        data = memoryview(data)
+        n = len(data)
+        with self._cond:
+            if n > self.capacity:
+                self._written += n - self.capacity
+                data = data[-self.capacity:]
+            pos = self._written % self.capacity
+            first = min(len(data), self.capacity - pos)
+            self._map[pos:pos + first] = data[:first]
+            if first < len(data):
+                self._map[:len(data) - first] = data[first:]
+            self._written += len(data)
+            if self._written - self._read > self.capacity:
+                self.dropped += self._written - self.capacity - self._read
+                self._read = self._written - self.capacity
+            self._cond.notify_all()
+        return n
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """End of stream: the reader gets what is left, then EOF."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # --- reader side ---
+
+    def read(self, size):
+        """Up to `size` bytes from the play position; b"" at end of stream or after abort()."""
+        with self._cond:
+            while not self._aborted and (self._paused or self._written == self._read) and not (
+                    self._closed and self._written == self._read):
+                self._cond.wait()
+            if self._aborted or self._written == self._read:
+                return b""
+            pos = self._read % self.capacity
+            n = min(size, self._written - self._read, self.capacity - pos)
+            chunk = self._map[pos:pos + n]
+            self._read += n
+            return chunk
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def seek_live(self):
+        """Drop everything buffered so playback continues from the live edge."""
+        with self._cond:
+            self._read = self._written
+
+    def behind(self):
+        """Bytes buffered between the play position and the live edge."""
+        with self._cond:
+            return self._written - self._read
+
+    def abort(self):
+        """Stop now: wake the reader with EOF even if paused or data is left."""
+        with self._cond:
+            self._aborted = True
+            self._cond.notify_all()
+
+    def release(self):
+        self._map.close()
@@ -0,0 +1,164 @@
+import functools
+import threading
+import time
+import config
+
+# Span tracing for the hot paths (search, parsing, rendering, playback startup).
+# Disabled unless --profile / FMCLI_PROFILE or a trace file is asked for; then
+# span() costs one global check and hands back a shared no-op context manager.
+
+_enabled = config.PROFILE or bool(config.TRACE_FILE)
+_spans = []  # (name, start_ns, end_ns, thread id, args), perf_counter_ns clock
+_threads = {}  # thread id -> name, for the trace viewer
+_dropped = 0
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _record(name, start_ns, end_ns, args):
+    global _dropped
+    if len(_spans) >= config.TRACE_MAX_SPANS:
+        _dropped += 1
+        return
+    tid = threading.get_ident()
+    if tid not in _threads:
+        _threads[tid] = threading.current_thread().name
+    _spans.append((name, start_ns, end_ns, tid, args))  # list.append is atomic across threads
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Forget the spans recorded so far."""
+    global _dropped
+    _spans.clear()
+    _threads.clear()
+    _dropped = 0
+
+
+def span(name, **args):
+    """
+    Context manager timing the enclosed block as `name`; keyword arguments
+    are attached to the span in the Chrome trace.
+    """
+    if not _enabled:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def traced(name):
+    """Decorator: time every call of the function as span `name`."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add(name, start, end, **args):
+    """Record a span measured elsewhere, from time.perf_counter() values."""
+    if _enabled:
+        _record(name, int(start * 1e9), int(end * 1e9), args)
+
+
+def _percentile(ordered, q):
+    """Nearest-rank percentile of a sorted list."""
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summary() -> list:
+    """Per span name: count, total and p50/p90/p99/max durations in milliseconds, slowest total first."""
+    durations = {}
+    for name, start, end, _, _ in list(_spans):
+        durations.setdefault(name, []).append((end - start) / 1e6)
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append({"name": name, "count": len(values), "total": sum(values), "p50": _percentile(values, 50),
+                     "p90": _percentile(values, 90), "p99": _percentile(values, 99), "max": values[-1]})
+    return sorted(rows, key=lambda row: -row["total"])
+
+
+def chrome_trace() -> dict:
+    """The spans as Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)."""
+    pid = 1
+    events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+              for tid, name in list(_threads.items())]
+    for name, start, end, tid, args in list(_spans):
+        events.append({"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                       "ts": start / 1000, "dur": (end - start) / 1000,
+                       "args": {k: str(v) for k, v in args.items()}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path):
+    import json
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+
+
+def report(trace_file=None):
+    """Print the per-phase percentiles to stderr and write the Chrome trace if a file is given."""
+    from rich.console import Console
+    from rich.table import Table
+
+    out = Console(stderr=True)
+    rows = summary()
+    if not rows:
+        out.print("[dim]profile: no spans recorded[/]")
+    else:
+        table = Table(title="Profile (ms)", header_style="bold magenta")
+        table.add_column("Span", style="cyan")
+        for column in ("Count", "Total", "p50", "p90", "p99", "Max"):
+            table.add_column(column, justify="right")
+        for row in rows:
+            table.add_row(row["name"], str(row["count"]),
+                          *(f"{row[k]:.1f}" for k in ("total", "p50", "p90", "p99", "max")))
+        out.print(table)
+    if _dropped:
+        out.print(f"[yellow]profile: {_dropped} spans dropped after the first {len(_spans)}[/]")
+    if trace_file:
+        try:
+            write_chrome_trace(trace_file)
+            out.print(f"[dim]trace written to {trace_file}[/]")
+        except OSError as e:
+            out.print(f"[red]❌ Could not write trace:[/] {e}")
@@ -0,0 +1,97 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+import config
+
+# Process-wide HTTP transport. Every HTTP request the package makes goes through
+# get() so connections to fmstream.org and stream hosts are pooled per host and
+# kept alive between requests.
+
+_lock = threading.Lock()
+_session = None
+_counters = {"requests": 0, "opened": 0}
+
+
+def _count(key):
+    with _lock:
+        _counters[key] += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        _count("opened")
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        _count("opened")
+        super().connect()
+
+
+class _CountingHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _CountingHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+    def urlopen(self, *args, **kwargs):
+        _count("requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _CountingHTTPPool, "https": _CountingHTTPSPool}
+
+
+def session() -> requests.Session:
+    """The shared session, created on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=config.HTTP_RETRIES,
+                backoff_factor=config.HTTP_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                raise_on_status=False,
+            )
+            adapter = _PooledAdapter(pool_connections=config.HTTP_POOL_HOSTS,
+                                     pool_maxsize=config.HTTP_POOL_SIZE, max_retries=retry)
+            s = requests.Session()
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
+
+
+def get(url, timeout=None, **kwargs) -> requests.Response:
+    """requests.get through the shared pool, with the configured (connect, read) timeout by default."""
+    if timeout is None:
+        timeout = (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+    return session().get(url, timeout=timeout, **kwargs)
+
+
+def stats() -> dict:
+    """Requests sent, connections opened and requests that reused a kept-alive connection."""
+    with _lock:
+        sent, opened = _counters["requests"], _counters["opened"]
+    return {"requests": sent, "opened": opened, "reused": max(0, sent - opened)}
+
+
+def close():
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None